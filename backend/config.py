@@ -9,6 +9,7 @@ ENV_FILE = BACKEND_DIR / ".env"
 class Settings(BaseSettings):
     MONGO_URI: str
     DB_NAME: str
+    MONGO_TLS: bool = True  # Atlas needs TLS; set false for a plain local mongod
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -23,6 +24,96 @@ class Settings(BaseSettings):
     PORT: int = 8000
     HOST: str = "0.0.0.0"
 
+    # Inference scheduler: sequences from all cameras are batched into one forward pass
+    INFERENCE_MAX_BATCH_SIZE: int = 8
+    INFERENCE_MAX_WAIT_MS: float = 25.0
+    # "sequence": full CNN-LSTM over 16 frames every PREDICT_EVERY frames
+    # "embedding": embed each frame once, run only the LSTM head on the rolling window
+    INFERENCE_MODE: str = "sequence"
+    EMBEDDING_PREDICT_EVERY: int = 1
+
+    # Pre-trigger snippet buffer: frames kept JPEG-compressed and downscaled
+    SNIPPET_PRE_TRIGGER_SECONDS: float = 5.0
+    SNIPPET_MAX_WIDTH: int = 960
+    SNIPPET_JPEG_QUALITY: int = 85
+    SNIPPET_BUFFER_MAX_MB: float = 32.0
+    # JPEG encoder threads shared by every camera's buffer; when they fall behind, frames are repeated
+    SNIPPET_ENCODER_THREADS: int = 2
+    # Snippet mp4 encoding runs in a worker pool fed by a bounded job queue
+    SNIPPET_ENCODER_WORKERS: int = 2
+    SNIPPET_ENCODE_QUEUE_SIZE: int = 8
+
+    # Per-camera reader thread: decoded frames waiting for the detection loop (file sources;
+    # live sources keep a single latest-frame slot)
+    CAPTURE_QUEUE_SIZE: int = 4
+    # File sources: "realtime" paces against a wall clock, "fast" processes as fast as possible
+    FILE_PACING: str = "realtime"
+
+    # Uploads are streamed to disk in chunks and rejected past this size
+    MAX_UPLOAD_MB: int = 2048
+
+    # Normalized "mezzanine" rendition transcoded in the background after upload
+    MEZZANINE_ENABLED: bool = True
+    MEZZANINE_USE_FOR_PIPELINE: bool = True
+    MEZZANINE_MAX_HEIGHT: int = 720
+    MEZZANINE_MAX_FPS: float = 30.0
+    MEZZANINE_KEYFRAME_INTERVAL: int = 15
+    MEZZANINE_WORKERS: int = 1
+
+    # Offline analysis: score timeline computed once per upload and replayed by file cameras
+    ANALYSIS_ON_UPLOAD: bool = True
+    ANALYSIS_STRIDE: int = 16  # Frames between scored windows (matches the live loop's cadence)
+    ANALYSIS_REPLAY: bool = True
+
+    # LRU cache of window predictions for looped uploaded files (entries)
+    PREDICTION_CACHE_SIZE: int = 4096
+
+    # Motion gate: skip predictions while fewer than THRESHOLD of the (downscaled, grayscale)
+    # pixels change by more than PIXEL_DELTA, but never for longer than MAX_SKIP_SECONDS
+    MOTION_GATE_ENABLED: bool = True
+    MOTION_GATE_THRESHOLD: float = 0.005
+    MOTION_GATE_PIXEL_DELTA: int = 25
+    MOTION_GATE_WIDTH: int = 160
+    MOTION_GATE_MAX_SKIP_SECONDS: float = 5.0
+
+    # Two-stage cascade: a small screening model scores every window and only windows scoring
+    # at least ESCALATE_THRESHOLD go to the full CNN-LSTM (active once aiModel/accident_screener.keras exists)
+    CASCADE_ENABLED: bool = True
+    CASCADE_ESCALATE_THRESHOLD: float = 0.2
+    CASCADE_SCREEN_SIZE: int = 112
+
+    # Runtime for the model graphs: "keras", "onnx" (needs onnxruntime) or "tflite";
+    # the latter two load the files written by export_model.py to aiModel/export/
+    INFERENCE_BACKEND: str = "keras"
+    # Precision of the tflite graphs: "float32", "float16" or "int8" (export_model.py --variant)
+    INFERENCE_MODEL_VARIANT: str = "float32"
+
+    # Inference worker processes, each with its own model; batches are passed through shared
+    # memory. 0 runs inference in a thread of the API process
+    INFERENCE_WORKERS: int = 0
+
+    # Save the built inference graphs under aiModel/cache/ so later boots skip rebuilding ResNet50
+    MODEL_CACHE_ENABLED: bool = True
+
+    # "all" serves HTTP and runs detection in one process. "detector" also serves the detector IPC
+    # channel; "api" never imports TensorFlow and forwards detection calls to the detector over it
+    PROCESS_ROLE: str = "all"
+    DETECTOR_IPC_HOST: str = "127.0.0.1"  # Bind address of a detector's IPC listener
+    DETECTOR_ADVERTISED_HOST: str = ""  # Address other hosts reach this node at (leases); defaults to DETECTOR_IPC_HOST
+    DETECTOR_IPC_PORT: int = 6001
+    DETECTOR_IPC_AUTHKEY: str = ""  # Defaults to SECRET_KEY
+
+    # Detector sharding: each detector node claims cameras through lease documents in Mongo
+    # (detector_leases), renewed every HEARTBEAT seconds; leases left unrenewed for TTL seconds
+    # move to other nodes. Every node needs its own DETECTOR_IPC_PORT
+    SHARDING_ENABLED: bool = False
+    DETECTOR_NODE_ID: str = ""  # Defaults to <hostname>:<DETECTOR_IPC_PORT>
+    LEASE_HEARTBEAT_SECONDS: float = 5.0
+    LEASE_TTL_SECONDS: float = 15.0
+
+    # How often a running detection loop re-reads its camera's pipeline config (PATCH /cameras/{id}/pipeline)
+    CAMERA_CONFIG_POLL_SECONDS: float = 2.0
+
     class Config:
         env_file = str(ENV_FILE)
         env_file_encoding = 'utf-8'
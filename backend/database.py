@@ -7,7 +7,8 @@ class Database:
 
     async def connect_to_database(self):
         try:
-            self.client = AsyncIOMotorClient(settings.MONGO_URI, tlsCAFile=certifi.where())
+            tls = {"tls": True, "tlsCAFile": certifi.where()} if settings.MONGO_TLS else {}
+            self.client = AsyncIOMotorClient(settings.MONGO_URI, **tls)
             self.db = self.client[settings.DB_NAME]
 
             # Test the connection
@@ -56,6 +57,11 @@ class Database:
             await self.db.alerts.create_index("time")
             print("   ✅ Created index on alerts.time")
 
+            # Detector sharding: one lease per camera (keyed by camera id), one document per node
+            await self.db.detector_leases.create_index("node_id")
+            await self.db.detector_nodes.create_index("expires_at")
+            print("   ✅ Created indexes on detector_leases.node_id and detector_nodes.expires_at")
+
             # Show final collection list
             final_collections = await self.db.list_collection_names()
             print(f"   📚 Available collections: {final_collections}")
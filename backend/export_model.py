@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Export the accident model for the ONNX Runtime / TFLite inference backends.
+
+Writes the inference-only graphs (sequence, backbone, head; the unused
+data-augmentation layer is dropped) to aiModel/export/<format>/, then runs
+a parity check: the exported files must reproduce the Keras accident
+scores on windows cut from the bundled Videos/ clips within --tolerance,
+otherwise they are removed again.
+
+TFLite graphs can also be quantized post-training (--variant float16 or
+int8, the latter calibrated on frames from Videos/). Quantized variants go
+through an accuracy gate instead: their accident/no-accident decisions on
+the labelled clips must agree with the float32 model.
+
+    python backend/export_model.py --format onnx
+    python backend/export_model.py --format tflite --tolerance 1e-3
+    python backend/export_model.py --format tflite --variant int8
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.services.accident_detection_service import accident_detection_service
+from backend.services.inference_backends import (
+    EXPORT_DIR, VARIANTS, KerasBackend, create_backend, export_onnx, export_tflite, record_export
+)
+
+VIDEOS_DIR = Path(__file__).resolve().parent.parent / "Videos"
+
+
+def clip_windows(video_path: Path, max_windows: int) -> Optional[np.ndarray]:
+    """Up to max_windows non-overlapping uint8 windows spread over the clip; None if it is too short"""
+    sequence_length = accident_detection_service.sequence_length
+    cap = cv2.VideoCapture(str(video_path))
+    frames = []
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(accident_detection_service.preprocess_frame(frame))
+    finally:
+        cap.release()
+    count = len(frames) // sequence_length
+    if count == 0:
+        return None
+    picks = np.linspace(0, count - 1, num=min(count, max_windows)).astype(int)
+    return np.stack([np.stack(frames[i * sequence_length:(i + 1) * sequence_length]) for i in picks])
+
+
+def accident_scores(backend, windows: np.ndarray, embedding: bool = False) -> np.ndarray:
+    """Accident score per window, through the full sequence graph or backbone + head"""
+    if not embedding:
+        return backend.predict_sequences(windows)[:, 1]
+    steps = windows.shape[1]
+    features = backend.embed_frames(windows.reshape((-1,) + windows.shape[2:]))
+    return backend.predict_features(features.reshape(len(windows), steps, -1))[:, 1]
+
+
+def parity_check(backend, clips, windows_per_clip: int, tolerance: float) -> bool:
+    reference = KerasBackend(accident_detection_service)
+    worst = 0.0
+    for clip in clips:
+        windows = clip_windows(clip, windows_per_clip)
+        if windows is None:
+            print(f"⚠️  {clip.name}: too short, skipped")
+            continue
+        for embedding in (False, True):
+            expected = accident_scores(reference, windows, embedding)
+            actual = accident_scores(backend, windows, embedding)
+            diff = float(np.max(np.abs(expected - actual)))
+            worst = max(worst, diff)
+            path = "backbone+head" if embedding else "sequence"
+            print(f"   {clip.name:<32} {path:<14} max |Δscore| = {diff:.2e}")
+    ok = worst <= tolerance
+    print(f"{'✅' if ok else '❌'} Parity: worst difference {worst:.2e} (tolerance {tolerance:.0e})")
+    return ok
+
+
+def clip_label(clip: Path) -> Optional[bool]:
+    """Ground truth from the clip name ("... No Accident ..." / "... Accident ..."), None if unlabelled"""
+    name = clip.stem.lower()
+    if "no accident" in name:
+        return False
+    if "accident" in name:
+        return True
+    return None
+
+
+def calibration_data(clips, windows_per_clip: int):
+    """Representative-dataset generators for int8 calibration, one per graph"""
+    windows = [w for w in (clip_windows(clip, windows_per_clip) for clip in clips) if w is not None]
+    windows = np.concatenate(windows)
+    reference = KerasBackend(accident_detection_service)
+    steps = windows.shape[1]
+    features = reference.embed_frames(windows.reshape((-1,) + windows.shape[2:])).reshape(len(windows), steps, -1)
+    print(f"🎚️  Calibrating on {len(windows)} windows from {len(clips)} clips")
+
+    def sequence():
+        for window in windows:
+            yield [window[np.newaxis]]
+
+    def backbone():
+        for window in windows:
+            for frame in window[::4]:
+                yield [frame[np.newaxis]]
+
+    def head():
+        for window_features in features:
+            yield [window_features[np.newaxis].astype(np.float32)]
+
+    return {"sequence": sequence, "backbone": backbone, "head": head}
+
+
+def accuracy_gate(backend, clips, windows_per_clip: int, min_agreement: float) -> bool:
+    """
+    Compare accident/no-accident decisions of backend against float32 Keras:
+    per-window agreement must reach min_agreement and every labelled clip
+    must get the same clip-level decision (any window over the threshold).
+    """
+    reference = KerasBackend(accident_detection_service)
+    threshold = accident_detection_service.confidence_threshold
+    agree = total = 0
+    clips_ok = True
+    correct = {"float32": 0, "variant": 0}
+    labelled = 0
+    for clip in clips:
+        label = clip_label(clip)
+        windows = clip_windows(clip, windows_per_clip)
+        if label is None or windows is None:
+            continue
+        labelled += 1
+        expected = accident_scores(reference, windows) > threshold
+        actual = accident_scores(backend, windows) > threshold
+        agree += int(np.sum(expected == actual))
+        total += len(windows)
+        same_decision = bool(expected.any()) == bool(actual.any())
+        clips_ok &= same_decision
+        correct["float32"] += bool(expected.any()) == label
+        correct["variant"] += bool(actual.any()) == label
+        print(f"   {clip.name:<32} label={'accident' if label else 'normal':<8} "
+              f"float32={'accident' if expected.any() else 'normal':<8} "
+              f"variant={'accident' if actual.any() else 'normal':<8} "
+              f"windows agree {int(np.sum(expected == actual))}/{len(windows)}")
+    if not total:
+        print("❌ No labelled clips for the accuracy gate")
+        return False
+    agreement = agree / total
+    ok = clips_ok and agreement >= min_agreement
+    print(f"   Clip accuracy vs labels: float32 {correct['float32']}/{labelled}, variant {correct['variant']}/{labelled}")
+    print(f"{'✅' if ok else '❌'} Accuracy gate: window agreement {agreement:.3f} (min {min_agreement}), "
+          f"clip decisions {'match' if clips_ok else 'differ'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["onnx", "tflite"], required=True)
+    parser.add_argument("--output-dir", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--videos", type=Path, default=VIDEOS_DIR, help="Clips for the parity check")
+    parser.add_argument("--windows-per-clip", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Max allowed accident score difference")
+    parser.add_argument("--skip-check", action="store_true")
+    parser.add_argument("--variant", choices=VARIANTS, default="float32", help="TFLite precision")
+    parser.add_argument("--calibration-windows-per-clip", type=int, default=8)
+    parser.add_argument("--gate-windows-per-clip", type=int, default=16)
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Fraction of windows whose decision must match float32")
+    args = parser.parse_args()
+    if args.variant != "float32" and args.format != "tflite":
+        parser.error("--variant needs --format tflite")
+
+    accident_detection_service.load_model(use_cache=False)
+    clips = sorted(args.videos.glob("*.mp4"))
+    if not clips and (args.variant == "int8" or not args.skip_check):
+        print(f"❌ No clips in {args.videos} for calibration / checks")
+        sys.exit(1)
+
+    out_dir = args.output_dir / args.format
+    print(f"📦 Exporting {args.variant} graphs to {out_dir}")
+    if args.format == "onnx":
+        paths = export_onnx(accident_detection_service, out_dir)
+    else:
+        calibration = calibration_data(clips, args.calibration_windows_per_clip) if args.variant == "int8" else None
+        paths = export_tflite(accident_detection_service, out_dir, args.variant, calibration)
+
+    if args.skip_check:
+        return
+    backend = create_backend(args.format, accident_detection_service, args.output_dir, variant=args.variant)
+    if args.variant == "float32":
+        passed = parity_check(backend, clips, args.windows_per_clip, args.tolerance)
+    else:
+        passed = accuracy_gate(backend, clips, args.gate_windows_per_clip, args.min_agreement)
+    if not passed:
+        # Graphs that fail their check must not be deployable
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+        record_export(out_dir, args.variant, None)
+        print(f"🗑️  Removed the {args.variant} graphs")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
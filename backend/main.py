@@ -1,16 +1,33 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 from .database import db
 from .config import settings
-from .routes import auth, users, cameras, streams, alerts, detection
+from .routes import auth, users, cameras, streams, alerts, health
+from .services.snippet_service import snippet_service
+from .services.transcode_service import transcode_service
+
+if settings.PROCESS_ROLE not in ("api", "detector", "all"):
+    raise ValueError(f"Unknown PROCESS_ROLE '{settings.PROCESS_ROLE}', expected api, detector or all")
+
+if settings.PROCESS_ROLE == "api":
+    # HTTP only: detection calls go to the detector process, the ML stack is never loaded here
+    from .routes import detection_proxy as detection
+else:
+    from .routes import detection
+    from .services.inference_scheduler import inference_scheduler
+    from .services.analysis_service import analysis_service
+    from .services.detector_ipc import detector_server
+    from .services.coordination_service import coordinator
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("=" * 50)
-    print("🚀 Starting Road Safety Monitoring System")
+    print(f"🚀 Starting Road Safety Monitoring System ({settings.PROCESS_ROLE} role)")
     print("=" * 50)
+    warmup_task = None
     try:
         print("📡 Connecting to database...")
         await db.connect_to_database()
@@ -20,6 +37,18 @@ async def lifespan(app: FastAPI):
         await auth.create_initial_admin()
         print("✅ Admin setup completed")
 
+        if settings.PROCESS_ROLE != "api":
+            # Load and warm up the model in the background; /health/ready reports when it is done
+            print("🧠 Loading AI model in the background...")
+            warmup_task = asyncio.create_task(inference_scheduler.warmup())
+        if settings.PROCESS_ROLE == "detector" or (settings.PROCESS_ROLE == "all" and settings.SHARDING_ENABLED):
+            detector_server.start(detection.ipc_handlers())
+            print(f"🔌 Serving detection to API processes on {settings.DETECTOR_IPC_HOST}:{settings.DETECTOR_IPC_PORT}")
+        if settings.PROCESS_ROLE != "api" and settings.SHARDING_ENABLED:
+            # Claim a share of the cameras with detection_active=True through Mongo leases
+            coordinator.start(**detection.coordinator_callbacks())
+            print(f"🧩 Detector node {coordinator.node_id} joined the cluster")
+
         # Migrate old alerts
         from .database import get_database
         from .models import get_pkt_now
@@ -54,6 +83,14 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("🛑 Shutting down...")
+    if settings.PROCESS_ROLE != "api":
+        await coordinator.shutdown()
+        detector_server.stop()
+        warmup_task.cancel()
+        await inference_scheduler.shutdown()
+        await analysis_service.shutdown()
+    await snippet_service.shutdown()
+    await transcode_service.shutdown()
     await db.close_database_connection()
     print("✅ Shutdown complete")
 
@@ -71,6 +108,7 @@ app.include_router(cameras.router)
 app.include_router(streams.router)
 app.include_router(alerts.router)
 app.include_router(detection.router)
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
@@ -61,12 +61,39 @@ class UserRegister(BaseModel):
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+class CameraPipelineConfig(BaseModel):
+    """Per-camera detection tuning, re-read by a running detection loop; None uses the global setting"""
+    predict_every: Optional[int] = Field(default=None, ge=1)  # Frames between predictions (16, or EMBEDDING_PREDICT_EVERY)
+    detection_threshold: int = Field(default=3, ge=1)  # Consecutive positive predictions before an alert
+    cooldown_period: int = Field(default=300, ge=0)  # Frames skipped after an alert
+    pre_trigger_seconds: Optional[float] = Field(default=None, ge=0, le=30)  # Snippet footage before the alert
+    post_trigger_seconds: float = Field(default=3.0, ge=0, le=30)  # Snippet footage after the alert
+    confidence_threshold: float = Field(default=0.5, gt=0, lt=1)  # Accident score that counts as positive
+    target_fps: Optional[float] = Field(default=None, gt=0, le=60)  # Process at most this many frames/s
+    motion_threshold: Optional[float] = Field(default=None, ge=0, le=1)  # Motion gate threshold
+
+    model_config = {"extra": "forbid"}
+
+class CameraPipelineUpdate(BaseModel):
+    """PATCH body for CameraPipelineConfig: only the fields sent change (null resets an optional one)"""
+    predict_every: Optional[int] = Field(default=None, ge=1)
+    detection_threshold: int = Field(default=None, ge=1)
+    cooldown_period: int = Field(default=None, ge=0)
+    pre_trigger_seconds: Optional[float] = Field(default=None, ge=0, le=30)
+    post_trigger_seconds: float = Field(default=None, ge=0, le=30)
+    confidence_threshold: float = Field(default=None, gt=0, lt=1)
+    target_fps: Optional[float] = Field(default=None, gt=0, le=60)
+    motion_threshold: Optional[float] = Field(default=None, ge=0, le=1)
+
+    model_config = {"extra": "forbid"}
+
 class CameraModel(BaseModel):
     id: Optional[PyObjectId] = Field(default=None, alias="_id")
     name: str
     location: str
     url: str
     status: str = "active"
+    pipeline: CameraPipelineConfig = Field(default_factory=CameraPipelineConfig)
     detection_active: bool = False
     detection_started_at: Optional[datetime] = None
     detection_stopped_at: Optional[datetime] = None
@@ -83,11 +110,46 @@ class CameraModel(BaseModel):
         "json_encoders": {ObjectId: str}
     }
 
+class VideoMetadata(BaseModel):
+    fps: float
+    width: int
+    height: int
+    frame_count: int
+    duration_seconds: Optional[float] = None
+    codec: Optional[str] = None
+
+class MezzanineInfo(BaseModel):
+    status: str = "pending"  # pending, running, done, failed
+    progress: float = 0.0
+    path: Optional[str] = None
+    metadata: Optional[dict] = None
+    error: Optional[str] = None
+
+class AnalysisInfo(BaseModel):
+    status: str = "pending"  # pending, running, done, failed
+    progress: float = 0.0
+    model_version: Optional[str] = None  # Hash of the weights the scores came from
+    source_path: Optional[str] = None  # File the frame indices refer to
+    sequence_length: Optional[int] = None
+    stride: Optional[int] = None
+    first_frame: Optional[int] = None  # Last frame of the first window
+    frame_count: Optional[int] = None
+    fps: Optional[float] = None
+    scores: List[float] = []  # Accident confidence per window
+    max_score: Optional[float] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+
 class StreamModel(BaseModel):
     id: Optional[PyObjectId] = Field(default=None, alias="_id")
     video_path: str
     stream_url: str
     is_active: bool = True
+    content_hash: Optional[str] = None  # sha256 of the uploaded bytes
+    size_bytes: Optional[int] = None
+    metadata: Optional[VideoMetadata] = None  # Probed once at upload
+    mezzanine: Optional[MezzanineInfo] = None  # Normalized, decode-friendly rendition
+    analysis: Optional[AnalysisInfo] = None  # Offline score timeline
     created_at: datetime = Field(default_factory=get_pkt_now)
 
     @field_serializer('created_at')
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request
 from typing import List
 from datetime import datetime
 from pathlib import Path
 from ..database import get_database
 from ..models import AlertModel, PyObjectId, get_pkt_now
 from ..services.email_service import email_service
+from ..services.file_service import serve_file
 from .users import get_current_user
 from bson import ObjectId
 import asyncio
@@ -203,12 +203,13 @@ SNIPPETS_DIR.mkdir(parents=True, exist_ok=True)
 
 
 @router.get("/snippet/{filename}")
-async def serve_snippet(filename: str):
-    """Serve an accident video snippet."""
-    file_path = SNIPPETS_DIR / filename
+async def serve_snippet(filename: str, request: Request):
+    """Serve an accident video snippet (Range/ETag aware for native playback and seeking)."""
+    file_path = SNIPPETS_DIR / Path(filename).name
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Snippet not found")
-    return FileResponse(str(file_path), media_type="video/mp4")
+    # Snippet names are unique and never rewritten
+    return serve_file(request, file_path, media_type="video/mp4", cache_control="private, max-age=86400, immutable")
 
 
 @router.delete("/{alert_id}")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from ..database import get_database
-from ..models import CameraModel, PyObjectId
+from ..models import CameraModel, CameraPipelineConfig, CameraPipelineUpdate, PyObjectId
+from ..services.camera_config_service import camera_config_service
 from .users import get_current_admin_user, get_current_user
 from bson import ObjectId
 router = APIRouter(prefix="/cameras", tags=["Cameras"])
@@ -23,4 +24,19 @@ async def delete_camera(camera_id: str, current_user: dict = Depends(get_current
     result = await db["cameras"].delete_one({"_id": ObjectId(camera_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Camera not found")
-    return {"message": "Camera deleted successfully"}
\ No newline at end of file
+    return {"message": "Camera deleted successfully"}
+@router.get("/{camera_id}/pipeline", response_model=CameraPipelineConfig)
+async def get_camera_pipeline(camera_id: str, current_user: dict = Depends(get_current_user)):
+    """The camera's detection tuning (null fields use the global settings)"""
+    db = await get_database()
+    camera = await db["cameras"].find_one({"_id": ObjectId(camera_id)}, {"pipeline": 1})
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera_config_service.get_config(camera)
+@router.patch("/{camera_id}/pipeline", response_model=CameraPipelineConfig)
+async def update_camera_pipeline(camera_id: str, changes: CameraPipelineUpdate, current_user: dict = Depends(get_current_admin_user)):
+    """Change some of the camera's detection tuning; a running detection loop picks it up within seconds"""
+    config = await camera_config_service.update(camera_id, changes.model_dump(exclude_unset=True))
+    if config is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return config
@@ -4,16 +4,24 @@ from datetime import datetime
 from collections import deque
 from pathlib import Path
 from ..database import get_database
+from ..config import settings
 from ..models import CameraModel, AlertModel, get_pkt_now
-from ..services.accident_detection_service import accident_detection_service
+from ..services.accident_detection_service import accident_detection_service, FeatureRing
+from ..services.inference_scheduler import inference_scheduler
+from ..services.snippet_service import snippet_service
+from ..services.capture_service import FramePacer, capture_service
+from ..services.transcode_service import playback_source
+from ..services.analysis_service import analysis_service
+from ..services.motion_service import motion_service
+from ..services.camera_config_service import camera_config_service
+from ..services.coordination_service import coordinator
+from ..services.detector_ipc import detector_client
 from .users import get_current_user
 from .alerts import create_alert
 from bson import ObjectId
 import numpy as np
-import cv2
 import asyncio
 import logging
-import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +30,30 @@ router = APIRouter(prefix="/detection", tags=["Accident Detection"])
 # Store background tasks for active detections
 active_detection_tasks = {}
 
+# Caller of requests arriving over the detector IPC channel: already authenticated and
+# routed by the sender, so they always run on this node
+IPC_CALLER = {"role": "detector-ipc"}
+
+async def attach_snippet(alert_id: str, snippet_job: asyncio.Future):
+    """Set snippet_url on an already-created alert once its snippet has been encoded"""
+    try:
+        snippet_url = await snippet_job
+    except Exception as e:
+        logger.error(f"Snippet for alert {alert_id} failed: {e}")
+        return
+    db = await get_database()
+    await db["alerts"].update_one(
+        {"_id": ObjectId(alert_id)},
+        {"$set": {"snippet_url": snippet_url}}
+    )
+    logger.info(f"Snippet attached to alert {alert_id}: {snippet_url}")
+
+def resolved_prediction(result) -> asyncio.Future:
+    """A prediction that needs no inference, shaped like a scheduler future"""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
+
 async def detection_loop(camera_id: str, camera_url: str, camera_name: str, camera_location: str):
     """Background task that continuously monitors a camera for accidents"""
     from pathlib import Path
@@ -34,6 +66,8 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
     
     # Extract stream ID from various URL formats and resolve to file path
     stream_id = None
+    stream_metadata = None  # fps/resolution probed at upload time
+    stream = None
     
     # Check for stream feed URL patterns
     if "/streams/feed/" in camera_url:
@@ -47,7 +81,8 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
             db = await get_database()
             stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
             if stream and "video_path" in stream:
-                camera_url = stream["video_path"]
+                # Prefer the normalized mezzanine rendition when it is ready
+                camera_url, stream_metadata = playback_source(stream)
                 logger.info(f"Resolved stream to video_path: {camera_url}")
             else:
                 logger.error(f"Stream not found in database: {stream_id}")
@@ -115,10 +150,24 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
             )
             return
     
+    # Uploaded files analyzed offline with the current weights replay their stored scores
+    timeline = None
+    if stream is not None and settings.ANALYSIS_REPLAY:
+        timeline = await analysis_service.load_timeline(stream, camera_url)
+        if timeline is not None:
+            logger.info(f"Replaying stored score timeline for camera {camera_id} ({len(timeline.scores)} windows)")
+
     logger.info(f"Opening stream: {camera_url}")
-    cap = cv2.VideoCapture(camera_url)
+    # Decoded once per source and shared with any MJPEG viewers of the same file/stream.
+    # Detection on a file sees every frame (lossless); live streams always stay at the head.
+    subscription = await capture_service.subscribe(
+        camera_url,
+        lossless=True,
+        queue_size=settings.CAPTURE_QUEUE_SIZE,
+        metadata=stream_metadata
+    )
     
-    if not cap.isOpened():
+    if subscription is None:
         logger.error(f"Failed to open stream for camera {camera_id}: {camera_url}")
         accident_detection_service.stop_detection(camera_id)
         # Update camera status in database
@@ -129,105 +178,110 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
         )
         return
 
+    # Per-camera tuning (PATCH /cameras/{id}/pipeline): detection threshold, cooldown, snippet
+    # windows, confidence, frame rate, resolution... re-read while the loop runs
+    embedding_mode = settings.INFERENCE_MODE == "embedding"
+    source_fps = subscription.hub.fps
+    config_watcher = await camera_config_service.watch(camera_id)
+    tuning = camera_config_service.resolve(config_watcher.config, source_fps, embedding_mode)
+    frame_credit = 0.0  # Source frames accumulated towards the next processed one (target_fps)
+
     consecutive_detections = 0
-    detection_threshold = 3  # Number of consecutive predictions before triggering alert
     cooldown_frames = 0
-    cooldown_period = 300  # Frames to wait after an alert (~10s at 30fps)
-    consecutive_failures = 0
-    max_failures = 10
 
     # Rolling buffer for video snippet capture
-    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    frame_delay = 1.0 / source_fps
-    snippet_buffer = deque(maxlen=int(source_fps * 5))  # ~5 seconds of pre-trigger video
+    pacer = FramePacer(source_fps, subscription.hub.is_live, as_fast_as_possible=settings.FILE_PACING == "fast")
+    capture_service.register(camera_id, subscription, pacer)
+    snippet_buffer = snippet_service.create_buffer(camera_id, tuning.fps, tuning.pre_trigger_seconds)  # Compressed pre-trigger video
+    # Cheap motion score per frame; static scenes skip the model up to a maximum skip interval
+    motion_gate = (motion_service.create_gate(camera_id, tuning.fps, config_watcher.config.motion_threshold)
+                   if timeline is None else None)
 
     # Post-capture state
-    POST_CAPTURE_FRAMES = int(source_fps * 3)  # ~3 seconds of post-accident footage
     post_capture_remaining = 0
     post_capture_frames = []
     post_capture_confidence = 0.0
     post_capture_time = None
 
-    # Snippets directory
-    snippets_dir = Path(__file__).resolve().parent.parent / "uploads" / "snippets"
-    snippets_dir.mkdir(parents=True, exist_ok=True)
-
-    loop = asyncio.get_event_loop()
-
     # Non-blocking prediction: fire prediction in background, check result later
     pending_prediction = None  # asyncio.Future or None
     frame_count = 0
-    PREDICT_EVERY = 16  # Run prediction every N frames
+
+    # Embedding mode: each frame goes through the backbone once, predictions run the head only
+    pending_embeddings = deque()  # Backbone futures, in frame order
+    MAX_PENDING_EMBEDDINGS = 2  # Skip frames instead of queueing when the backbone falls behind
+    embedded_since_prediction = 0
+    embedding_paused = False  # Static scene: the backbone is skipped too
+    if embedding_mode:
+        feature_ring = accident_detection_service.feature_rings.get(camera_id)
+        if feature_ring is None:
+            feature_ring = FeatureRing(accident_detection_service.sequence_length,
+                                       accident_detection_service.feature_dim)
+            accident_detection_service.feature_rings[camera_id] = feature_ring
+
+    # Uploaded files (sequence mode): windows are aligned to frame indices within the file so every
+    # pass over it produces the same windows, and their predictions are memoized
+    cache_key = None
+    if stream is not None and stream.get("content_hash") and not embedding_mode:
+        variant = "original" if os.path.normpath(stream["video_path"]) == camera_url else "mezzanine"
+        cache_key = f"{stream['content_hash']}:{variant}"
+    contiguous_frames = 0  # Frames in the ring that follow each other in the file
+    replayed_window = None  # Last timeline window replayed, and the frame_count it was replayed at
+    replayed_at = -tuning.predict_every
+    last_index = None
 
     # Initialize model frame buffer
     if camera_id not in accident_detection_service.frame_buffers:
-        accident_detection_service.frame_buffers[camera_id] = deque(maxlen=accident_detection_service.sequence_length)
+        accident_detection_service.frame_buffers[camera_id] = accident_detection_service.new_frame_ring()
+    frame_ring = accident_detection_service.frame_buffers[camera_id]
 
     while accident_detection_service.is_detection_active(camera_id):
         try:
-            ret, frame = await loop.run_in_executor(None, cap.read)
-
-            if not ret:
-                consecutive_failures += 1
-                logger.warning(f"Failed to read frame from camera {camera_id} ({consecutive_failures}/{max_failures})")
-
-                if not camera_url.startswith(("http://", "https://", "rtsp://")):
-                    logger.info(f"Video file ended for camera {camera_id}, restarting...")
-                    cap.release()
-                    cap = cv2.VideoCapture(camera_url)
-                    consecutive_failures = 0
-                    continue
+            # Frames are decoded by the source's shared reader thread
+            captured = await subscription.get()
 
-                if consecutive_failures >= max_failures:
-                    logger.error(f"Max failures reached for camera {camera_id}, stopping")
-                    accident_detection_service.stop_detection(camera_id)
-                    db = await get_database()
-                    await db["cameras"].update_one(
-                        {"_id": ObjectId(camera_id)},
-                        {"$set": {"detection_active": False, "detection_stopped_at": get_pkt_now()}}
-                    )
-                    break
+            if captured is None:
+                # Reader gave up after repeated read failures (file sources restart on their own)
+                logger.error(f"Max failures reached for camera {camera_id}, stopping")
+                accident_detection_service.stop_detection(camera_id)
+                db = await get_database()
+                await db["cameras"].update_one(
+                    {"_id": ObjectId(camera_id)},
+                    {"$set": {"detection_active": False, "detection_stopped_at": get_pkt_now()}}
+                )
+                break
 
-                await asyncio.sleep(1)
-                cap.release()
-                cap = cv2.VideoCapture(camera_url)
-                continue
+            # Sleep until this frame is due (files) or just measure staleness (live)
+            await pacer.pace(captured)
+            frame = captured.image
 
-            consecutive_failures = 0
+            # Pick up pipeline changes made while detection is running
+            new_config = await config_watcher.poll()
+            if new_config is not None:
+                tuning = camera_config_service.resolve(new_config, source_fps, embedding_mode)
+                snippet_buffer.set_duration(tuning.fps, tuning.pre_trigger_seconds)
+                motion_service.configure_gate(camera_id, tuning.fps, new_config.motion_threshold)
+                logger.info(f"Applied new pipeline config for camera {camera_id}: {new_config.model_dump()}")
 
             if frame is not None:
+                # Drop source frames beyond the camera's target fps
+                frame_credit += 1.0
+                if frame_credit < tuning.frame_step:
+                    continue
+                frame_credit -= tuning.frame_step
                 frame_count += 1
 
                 # --- Post-capture phase: collect frames after accident trigger ---
                 if post_capture_remaining > 0:
-                    post_capture_frames.append(frame.copy())
+                    post_capture_frames.append(snippet_buffer.encode(frame))
                     post_capture_remaining -= 1
 
                     if post_capture_remaining == 0:
                         try:
                             db = await get_database()
 
-                            all_frames = list(snippet_buffer) + post_capture_frames
-                            snippet_url = None
-                            if len(all_frames) > 0:
-                                try:
-                                    write_fps = source_fps
-                                    snippet_filename = f"{uuid.uuid4()}.mp4"
-                                    snippet_path = str(snippets_dir / snippet_filename)
-                                    h, w = all_frames[0].shape[:2]
-                                    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-                                    writer = cv2.VideoWriter(snippet_path, fourcc, write_fps, (w, h))
-                                    if not writer.isOpened():
-                                        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                                        writer = cv2.VideoWriter(snippet_path, fourcc, write_fps, (w, h))
-                                    for f in all_frames:
-                                        writer.write(f)
-                                    writer.release()
-                                    snippet_url = f"/alerts/snippet/{snippet_filename}"
-                                    logger.info(f"Snippet saved: {snippet_path} ({len(all_frames)} frames at {write_fps:.0f}fps)")
-                                except Exception as e:
-                                    logger.error(f"Error saving snippet: {e}")
-
+                            # Insert the alert right away; the snippet is encoded off the event loop
+                            # and attached to the alert once it is written
                             alert_data = {
                                 "location": camera_location,
                                 "time": post_capture_time,
@@ -240,7 +294,7 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
                                 "dispatch_type": None,
                                 "admin_decision_time": None,
                                 "dispatched_at": None,
-                                "snippet_url": snippet_url
+                                "snippet_url": None
                             }
 
                             result = await db["alerts"].insert_one(alert_data)
@@ -249,42 +303,76 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
                             from .alerts import schedule_auto_dispatch
                             schedule_auto_dispatch(str(result.inserted_id))
 
+                            snippet_frames = snippet_buffer.drain() + post_capture_frames
+                            if snippet_frames:
+                                snippet_job = snippet_service.submit(snippet_frames, tuning.fps)
+                                if snippet_job is not None:
+                                    asyncio.create_task(attach_snippet(str(result.inserted_id), snippet_job))
+
                         except Exception as e:
                             logger.error(f"Error creating alert: {e}")
 
                         post_capture_frames = []
                         snippet_buffer.clear()
 
-                    await asyncio.sleep(frame_delay)
                     continue
 
                 # --- Normal phase: buffer frames for snippets + run detection ---
-                snippet_buffer.append(frame.copy())
+                snippet_buffer.append(frame)
 
                 if cooldown_frames > 0:
                     cooldown_frames -= 1
-                    await asyncio.sleep(frame_delay)
                     continue
 
+                if motion_gate is not None:
+                    motion_gate.update(frame)
+
                 # Preprocess and add to model buffer (fast — no prediction here)
-                processed = accident_detection_service.preprocess_frame(frame)
-                accident_detection_service.frame_buffers[camera_id].append(processed)
+                if timeline is not None:
+                    pass  # Scores come from the timeline; nothing to buffer
+                elif embedding_mode and motion_gate is not None and motion_gate.skip_embedding(
+                        accident_detection_service.sequence_length):
+                    embedding_paused = True
+                elif embedding_mode:
+                    if embedding_paused:
+                        # Motion resumed: the buffered window has a gap, refill it with fresh frames
+                        embedding_paused = False
+                        for pending in pending_embeddings:
+                            pending.cancel()
+                        pending_embeddings.clear()
+                        feature_ring.clear()
+                        embedded_since_prediction = 0
+                    processed = accident_detection_service.preprocess_frame(frame)
+                    # Move finished embeddings into the feature ring, keeping frame order
+                    while pending_embeddings and pending_embeddings[0].done():
+                        try:
+                            feature_ring.push(pending_embeddings.popleft().result())
+                            embedded_since_prediction += 1
+                        except Exception as e:
+                            logger.error(f"Embedding error: {e}")
+                    if len(pending_embeddings) < MAX_PENDING_EMBEDDINGS:
+                        pending_embeddings.append(inference_scheduler.embed(camera_id, processed))
+                else:
+                    frame_ring.push(frame)
+                    contiguous = last_index is not None and captured.index == last_index + 1
+                    contiguous_frames = contiguous_frames + 1 if contiguous else 1
+                    last_index = captured.index
 
                 # Check if a background prediction finished
                 if pending_prediction is not None and pending_prediction.done():
                     try:
-                        is_accident, confidence = pending_prediction.result()
-                        if is_accident:
+                        _, confidence = pending_prediction.result()
+                        if confidence > tuning.confidence_threshold:
                             consecutive_detections += 1
                             logger.info(f"Accident detected! Consecutive: {consecutive_detections}, Confidence: {confidence:.4f}")
-                            if consecutive_detections >= detection_threshold:
+                            if consecutive_detections >= tuning.detection_threshold:
                                 logger.warning(f"ACCIDENT CONFIRMED at {camera_name} ({camera_location})")
-                                post_capture_remaining = POST_CAPTURE_FRAMES
+                                post_capture_remaining = tuning.post_capture_frames
                                 post_capture_frames = []
                                 post_capture_confidence = confidence
                                 post_capture_time = get_pkt_now()
                                 consecutive_detections = 0
-                                cooldown_frames = cooldown_period
+                                cooldown_frames = tuning.cooldown_frames
                         else:
                             consecutive_detections = 0
                     except Exception as e:
@@ -292,19 +380,48 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
                     pending_prediction = None
 
                 # Fire off a new prediction if none is running
-                if (pending_prediction is None and
-                    frame_count % PREDICT_EVERY == 0 and
-                    len(accident_detection_service.frame_buffers[camera_id]) >= accident_detection_service.sequence_length):
-                    # Snapshot the buffer so the executor thread reads a stable copy
-                    buffer_snapshot = deque(list(accident_detection_service.frame_buffers[camera_id]),
-                                           maxlen=accident_detection_service.sequence_length)
-                    pending_prediction = loop.run_in_executor(
-                        None,
-                        accident_detection_service.predict_accident,
-                        buffer_snapshot
-                    )
-
-            await asyncio.sleep(frame_delay)
+                if timeline is not None:
+                    # Each stored window is replayed once, no more often than the camera's predict_every
+                    window = timeline.window_at(captured.index)
+                    if (pending_prediction is None and window is not None and window != replayed_window and
+                            frame_count - replayed_at >= tuning.predict_every):
+                        replayed_window, replayed_at = window, frame_count
+                        score = timeline.scores[window]
+                        pending_prediction = resolved_prediction((score > tuning.confidence_threshold, score))
+                elif embedding_mode:
+                    if (pending_prediction is None and
+                        embedded_since_prediction >= tuning.predict_every and
+                        feature_ring.is_full()):
+                        embedded_since_prediction = 0
+                        if motion_gate is None or motion_gate.allow_prediction():
+                            pending_prediction = inference_scheduler.submit_features(camera_id, feature_ring.ordered())
+                elif (pending_prediction is None and
+                    (captured.index + 1 if cache_key and tuning.frame_step == 1.0 else frame_count) % tuning.predict_every == 0 and
+                    len(frame_ring) >= accident_detection_service.sequence_length):
+                    window_start = None
+                    if cache_key and contiguous_frames >= accident_detection_service.sequence_length:
+                        window_start = captured.index - accident_detection_service.sequence_length + 1
+                    # Cameras tuned at or below the escalation threshold bypass the screen (see below)
+                    use_cascade = tuning.confidence_threshold > settings.CASCADE_ESCALATE_THRESHOLD
+                    cached = (accident_detection_service.cached_prediction(cache_key, window_start, use_cascade)
+                              if window_start is not None else None)
+                    if cached is not None:
+                        # Same window of the same file on an earlier pass
+                        pending_prediction = resolved_prediction(cached)
+                    elif motion_gate is None or motion_gate.allow_prediction():
+                        # Ordered copy into the ring's reused snapshot; the inference thread reads it
+                        # while the ring keeps filling (only one prediction is in flight per camera)
+                        sequence = frame_ring.ordered()
+                        # Batched together with the other cameras' sequences by the scheduler; screened
+                        # by the small model first when the cascade is active
+                        if use_cascade:
+                            pending_prediction = inference_scheduler.submit_cascade(camera_id, sequence)
+                        else:
+                            # The screen would drop windows this camera counts as positive
+                            pending_prediction = inference_scheduler.submit(camera_id, sequence)
+                        if window_start is not None:
+                            accident_detection_service.cache_prediction(cache_key, window_start, pending_prediction,
+                                                                        use_cascade)
 
         except asyncio.CancelledError:
             logger.info(f"Detection task cancelled for camera {camera_id}")
@@ -314,7 +431,14 @@ async def detection_loop(camera_id: str, camera_url: str, camera_name: str, came
             await asyncio.sleep(1)
 
     # Cleanup
-    cap.release()
+    if pending_prediction is not None:
+        pending_prediction.cancel()
+    for pending in pending_embeddings:
+        pending.cancel()
+    subscription.close()
+    capture_service.unregister(camera_id)
+    snippet_service.release_buffer(camera_id)
+    motion_service.release_gate(camera_id)
     accident_detection_service.stop_detection(camera_id)
     logger.info(f"Detection loop ended for camera {camera_id}")
 
@@ -332,15 +456,31 @@ async def start_detection(
         
         if not camera:
             raise HTTPException(status_code=404, detail="Camera not found")
+
+        # Sharded: a camera another node holds the lease of is started (or already running) there
+        if coordinator.enabled and current_user is not IPC_CALLER:
+            owner = await coordinator.route(camera_id)
+            if owner is not None:
+                return await detector_client.request("start", owner, camera_id=camera_id)
         
         # Check if detection is already running
         if accident_detection_service.is_detection_active(camera_id):
             return {"message": "Detection already active", "camera_id": camera_id}
+
+        # The model loads in the background at startup; never load it on the event loop here
+        if not inference_scheduler.is_ready:
+            status = inference_scheduler.get_model_status()
+            raise HTTPException(status_code=503, detail=f"Model not ready ({status['state']}), try again shortly")
+
+        if coordinator.enabled and not await coordinator.claim(camera_id):
+            raise HTTPException(status_code=409, detail="Camera was just claimed by another detector node")
         
         # Start detection service
         started = await accident_detection_service.start_detection(camera_id, camera["url"])
         
         if not started:
+            if coordinator.enabled:
+                await coordinator.release(camera_id)
             raise HTTPException(status_code=400, detail="Failed to start detection")
         
         # Start background detection loop
@@ -372,37 +512,50 @@ async def start_detection(
         raise
     except Exception as e:
         logger.error(f"Error starting detection: {e}")
+        if coordinator.enabled:
+            await coordinator.release(camera_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def halt_detection(camera_id: str):
+    """Stop this process's detection loop for a camera (its detection_active flag is left alone)"""
+    # Stop detection service first
+    stopped = accident_detection_service.stop_detection(camera_id)
+
+    logger.info(f"Detection service stopped for camera {camera_id}: {stopped}")
+
+    # Cancel background task if exists
+    if camera_id in active_detection_tasks:
+        task = active_detection_tasks[camera_id]
+        task.cancel()
+
+        # Wait for the task to actually finish (with timeout)
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=2.0)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Task was cancelled or didn't finish in time, that's okay
+            pass
+        except Exception as e:
+            logger.warning(f"Error while waiting for task cancellation: {e}")
+
+        # Remove from active tasks
+        del active_detection_tasks[camera_id]
+        logger.info(f"Background task cancelled for camera {camera_id}")
+
 @router.post("/stop/{camera_id}")
 async def stop_detection(
     camera_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Stop accident detection for a specific camera"""
+    # Sharded: the node holding the camera's lease stops it
+    if coordinator.enabled and current_user is not IPC_CALLER:
+        owner = await coordinator.route(camera_id)
+        if owner is not None:
+            return await detector_client.request("stop", owner, camera_id=camera_id)
     try:
-        # Stop detection service first
-        stopped = accident_detection_service.stop_detection(camera_id)
-
-        logger.info(f"Detection service stopped for camera {camera_id}: {stopped}")
-
-        # Cancel background task if exists
-        if camera_id in active_detection_tasks:
-            task = active_detection_tasks[camera_id]
-            task.cancel()
-
-            # Wait for the task to actually finish (with timeout)
-            try:
-                await asyncio.wait_for(asyncio.shield(task), timeout=2.0)
-            except (asyncio.CancelledError, asyncio.TimeoutError):
-                # Task was cancelled or didn't finish in time, that's okay
-                pass
-            except Exception as e:
-                logger.warning(f"Error while waiting for task cancellation: {e}")
-
-            # Remove from active tasks
-            del active_detection_tasks[camera_id]
-            logger.info(f"Background task cancelled for camera {camera_id}")
+        await halt_detection(camera_id)
+        if coordinator.enabled:
+            await coordinator.release(camera_id)
 
         # Update camera status in database
         db = await get_database()
@@ -428,6 +581,11 @@ async def get_detection_status(
     current_user: dict = Depends(get_current_user)
 ):
     """Get the current detection status for a camera"""
+    # Sharded: only the owning node knows whether the loop is really running
+    if coordinator.enabled and current_user is not IPC_CALLER:
+        owner = await coordinator.route(camera_id)
+        if owner is not None:
+            return await detector_client.request("status", owner, camera_id=camera_id)
     is_active = accident_detection_service.is_detection_active(camera_id)
     
     # Get camera info
@@ -441,5 +599,87 @@ async def get_detection_status(
         "camera_id": camera_id,
         "detection_active": is_active,
         "camera_name": camera.get("name"),
-        "camera_location": camera.get("location")
+        "camera_location": camera.get("location"),
+        "node_id": coordinator.node_id if coordinator.enabled and is_active else None
+    }
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(current_user: dict = Depends(get_current_user)):
+    """Get batching statistics of the shared inference scheduler"""
+    return inference_scheduler.get_stats()
+
+@router.get("/memory")
+async def get_memory_report(current_user: dict = Depends(get_current_user)):
+    """Get per-camera buffer memory usage for all cameras with active detection"""
+    cameras = {}
+    for camera_id, active in accident_detection_service.active_detections.items():
+        if not active:
+            continue
+        report = accident_detection_service.get_memory_report(camera_id)
+        report.update(snippet_service.get_memory_report(camera_id))
+        report["total_bytes"] += report["snippet_buffer_bytes"]
+        cameras[camera_id] = report
+    return {
+        "cameras": cameras,
+        "total_bytes": sum(report["total_bytes"] for report in cameras.values())
+    }
+
+@router.get("/cache/stats")
+async def get_prediction_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counters of the prediction cache for looped files"""
+    return accident_detection_service.prediction_cache.get_stats()
+
+@router.get("/motion/stats")
+async def get_motion_stats(current_user: dict = Depends(get_current_user)):
+    """Per-camera motion gate: predictions run vs skipped on static scenes"""
+    return motion_service.get_stats()
+
+@router.get("/snippets/stats")
+async def get_snippet_stats(current_user: dict = Depends(get_current_user)):
+    """Get snippet encoder pool statistics (encoder threads, repeated frames, encode time, queue depth, dropped jobs)"""
+    return snippet_service.get_stats()
+
+@router.get("/capture/stats")
+async def get_capture_stats(current_user: dict = Depends(get_current_user)):
+    """Get per-camera capture and pacing statistics (lag in ms, skipped/dropped frames)"""
+    return capture_service.get_stats()
+
+@router.get("/cluster")
+async def get_cluster_state(current_user: dict = Depends(get_current_user)):
+    """Detector nodes, which node owns each camera and cameras waiting for a node"""
+    state = await coordinator.get_cluster_state()
+    state["this_node"] = coordinator.get_stats() if coordinator.enabled else None
+    return state
+
+def ipc_handlers() -> dict:
+    """
+    Operations a detector-role process serves to API-role processes over the
+    detector IPC channel (see services/detector_ipc.py). The API process has
+    already authenticated the caller, so no user is passed on.
+    """
+    return {
+        "start": lambda camera_id: start_detection(camera_id, BackgroundTasks(), IPC_CALLER),
+        "stop": lambda camera_id: stop_detection(camera_id, IPC_CALLER),
+        "status": lambda camera_id: get_detection_status(camera_id, IPC_CALLER),
+        "scheduler_stats": lambda: get_scheduler_stats(IPC_CALLER),
+        "memory": lambda: get_memory_report(IPC_CALLER),
+        "cache_stats": lambda: get_prediction_cache_stats(IPC_CALLER),
+        "motion_stats": lambda: get_motion_stats(IPC_CALLER),
+        "snippet_stats": lambda: get_snippet_stats(IPC_CALLER),
+        "capture_stats": lambda: get_capture_stats(IPC_CALLER),
+        "model_status": _model_status,
+        "analyze": analysis_service.schedule,
+        "timeline_current": analysis_service.timeline_is_current,
+    }
+
+async def _model_status() -> dict:
+    return inference_scheduler.get_model_status()
+
+def coordinator_callbacks() -> dict:
+    """How the detector coordinator runs and halts cameras on this node"""
+    return {
+        "start_camera": lambda camera_id: start_detection(camera_id, BackgroundTasks(), IPC_CALLER),
+        "stop_camera": halt_detection,
+        "is_running": lambda camera_id: camera_id in active_detection_tasks and not active_detection_tasks[camera_id].done(),
+        "is_ready": lambda: inference_scheduler.is_ready,
     }
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends
+from ..services.coordination_service import coordinator
+from ..services.detector_ipc import detector_client, detector_for
+from .users import get_current_user
+
+# Detection routes of an API-role process (PROCESS_ROLE=api): same paths as
+# routes/detection.py, but every call is run by a detector process over
+# local IPC (the camera's owning node when sharded), so this process never
+# imports TensorFlow.
+
+router = APIRouter(prefix="/detection", tags=["Accident Detection"])
+
+async def node_stats(operation: str) -> dict:
+    """An operation's result from the detector, or from every live node by node id when sharded"""
+    if not coordinator.enabled:
+        return await detector_client.request(operation)
+    return {
+        node["_id"]: await detector_client.request(operation, tuple(node["address"]))
+        for node in await coordinator.live_nodes()
+    }
+
+@router.post("/start/{camera_id}")
+async def start_detection(camera_id: str, current_user: dict = Depends(get_current_user)):
+    """Start accident detection for a specific camera"""
+    return await detector_client.request("start", await detector_for(camera_id), camera_id=camera_id)
+
+@router.post("/stop/{camera_id}")
+async def stop_detection(camera_id: str, current_user: dict = Depends(get_current_user)):
+    """Stop accident detection for a specific camera"""
+    return await detector_client.request("stop", await detector_for(camera_id), camera_id=camera_id)
+
+@router.get("/status/{camera_id}")
+async def get_detection_status(camera_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the current detection status for a camera"""
+    return await detector_client.request("status", await detector_for(camera_id), camera_id=camera_id)
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(current_user: dict = Depends(get_current_user)):
+    """Get batching statistics of the shared inference scheduler"""
+    return await node_stats("scheduler_stats")
+
+@router.get("/memory")
+async def get_memory_report(current_user: dict = Depends(get_current_user)):
+    """Get per-camera buffer memory usage for all cameras with active detection"""
+    return await node_stats("memory")
+
+@router.get("/cache/stats")
+async def get_prediction_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counters of the prediction cache for looped files"""
+    return await node_stats("cache_stats")
+
+@router.get("/motion/stats")
+async def get_motion_stats(current_user: dict = Depends(get_current_user)):
+    """Per-camera motion gate: predictions run vs skipped on static scenes"""
+    return await node_stats("motion_stats")
+
+@router.get("/snippets/stats")
+async def get_snippet_stats(current_user: dict = Depends(get_current_user)):
+    """Get snippet encoder pool statistics (encoder threads, repeated frames, encode time, queue depth, dropped jobs)"""
+    return await node_stats("snippet_stats")
+
+@router.get("/capture/stats")
+async def get_capture_stats(current_user: dict = Depends(get_current_user)):
+    """Get per-camera capture and pacing statistics (lag in ms, skipped/dropped frames)"""
+    return await node_stats("capture_stats")
+
+@router.get("/cluster")
+async def get_cluster_state(current_user: dict = Depends(get_current_user)):
+    """Detector nodes, which node owns each camera and cameras waiting for a node"""
+    return await coordinator.get_cluster_state()
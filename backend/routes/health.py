@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from ..config import settings
+from ..database import db
+from ..services.detector_ipc import detector_client, detector_for
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests (the model may still be loading)"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    503 until the model is loaded and warmed up and the database is connected.
+    An API-role process has no model: it is ready once the database is
+    connected and reports the detector's model status alongside.
+    """
+    database_connected = db.db is not None
+    if settings.PROCESS_ROLE == "api":
+        try:
+            model = await detector_client.request("model_status", await detector_for())
+        except HTTPException as e:
+            model = {"state": "unreachable", "error": e.detail}
+        ready = database_connected
+    else:
+        from ..services.inference_scheduler import inference_scheduler
+        model = inference_scheduler.get_model_status()
+        ready = inference_scheduler.is_ready and database_connected
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "role": settings.PROCESS_ROLE,
+            "model": model,
+            "database": "connected" if database_connected else "disconnected",
+        }
+    )
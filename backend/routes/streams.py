@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
 from fastapi.responses import StreamingResponse
-from typing import List
-import shutil
+from typing import List, Optional
 import os
-import uuid
 from pathlib import Path
 from ..database import get_database
 from ..models import StreamModel
-from ..services.stream_service import stream_service
+from ..services.stream_service import stream_service, resolve_rendition, STREAM_PRESETS
+from ..services.file_service import serve_file
+from ..services.ingest_service import ingest_service, UploadTooLarge
+from ..services.transcode_service import transcode_service, playback_source
+from ..services.detector_ipc import schedule_analysis, timeline_is_current
+from ..config import settings
 from .users import get_current_admin_user, get_current_user
 from bson import ObjectId
 router = APIRouter(prefix="/streams", tags=["Streams"])
@@ -17,18 +20,34 @@ UPLOAD_DIR = Path(__file__).resolve().parent.parent / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
 @router.post("/upload", response_model=StreamModel)
 async def upload_video(
-    file: UploadFile = File(...), 
+    request: Request,
+    normalize: Optional[bool] = None,
     current_user: dict = Depends(get_current_admin_user)
 ):
-    file_ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = str(UPLOAD_DIR / filename)  # Use Path for cross-platform path handling
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    """Upload a video as the multipart field "file" (at most MAX_UPLOAD_MB)"""
+    # The body is parsed here rather than as an UploadFile parameter so an oversized
+    # upload is refused before it is spooled to disk
+    try:
+        file = await ingest_service.read_upload(request)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if file is None:
+        raise HTTPException(status_code=422, detail="Missing upload field 'file'")
+    try:
+        # Chunked async write + content hash + one-time probe; identical re-uploads share the stored file
+        try:
+            ingested = await ingest_service.ingest(file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
     stream_entry = StreamModel(
-        video_path=file_path,
+        video_path=ingested["video_path"],
         stream_url="", 
-        is_active=True
+        is_active=True,
+        content_hash=ingested["content_hash"],
+        size_bytes=ingested["size_bytes"],
+        metadata=ingested["metadata"]
     )
     db = await get_database()
     new_stream = stream_entry.model_dump(by_alias=True, exclude={"id"})
@@ -39,27 +58,91 @@ async def upload_video(
         {"_id": result.inserted_id},
         {"$set": {"stream_url": stream_url}}
     )
+    # Background transcode to the decode-friendly mezzanine rendition
+    if normalize if normalize is not None else settings.MEZZANINE_ENABLED:
+        await transcode_service.schedule(stream_id, ingested["video_path"], ingested["content_hash"])
+    # One offline pass over the file (waits for the mezzanine when one is being made)
+    if settings.ANALYSIS_ON_UPLOAD:
+        try:
+            await schedule_analysis(stream_id)
+        except HTTPException as e:
+            # The upload itself succeeded; the analysis can be started later via /analyze
+            print(f"Could not schedule analysis of stream {stream_id}: {e.detail}")
     created_stream = await db["streams"].find_one({"_id": result.inserted_id})
     return created_stream
 @router.get("/feed/{stream_id}")
-async def video_feed(stream_id: str):
+async def video_feed(
+    stream_id: str,
+    preset: Optional[str] = None,
+    width: Optional[int] = Query(None, ge=64, le=3840),
+    quality: Optional[int] = Query(None, ge=10, le=95),
+    fps: Optional[float] = Query(None, gt=0, le=60)
+):
     db = await get_database()
     stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     if not stream.get("is_active", True):
         raise HTTPException(status_code=404, detail="Stream is inactive")
-    video_path = stream["video_path"]
+    # Decode the normalized rendition when it is ready
+    video_path, _ = playback_source(stream)
     if not os.path.exists(video_path):
          raise HTTPException(status_code=404, detail="Video file not found")
+    try:
+        rendition = resolve_rendition(preset, width, quality, fps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return StreamingResponse(
-        stream_service.generate_frames(video_path),
+        stream_service.generate_frames(video_path, rendition),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
-@router.get("/", response_model=List[StreamModel])
+@router.get("/video/{stream_id}")
+async def play_video(stream_id: str, request: Request, original: bool = False):
+    """Serve the stored video itself (Range/ETag aware) so browsers can play and seek it natively.
+    The short-GOP mezzanine rendition is served when ready (faster seeks) unless original=true."""
+    db = await get_database()
+    stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    video_path = Path(stream["video_path"] if original else playback_source(stream)[0])
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video file not found")
+    return serve_file(request, video_path)
+@router.get("/presets")
+async def list_stream_presets():
+    """Available feed presets (width, JPEG quality, fps)"""
+    return {name: rendition._asdict() for name, rendition in STREAM_PRESETS.items()}
+@router.get("/stats")
+async def get_stream_stats(current_user: dict = Depends(get_current_user)):
+    """Connected MJPEG viewers and outgoing bytes/s per broadcast"""
+    return stream_service.get_stats()
+@router.post("/{stream_id}/analyze")
+async def analyze_stream(stream_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """(Re)compute the stream's score timeline, e.g. after the model weights changed"""
+    db = await get_database()
+    stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    if not await schedule_analysis(stream_id):
+        return {"message": "Analysis already running", "stream_id": stream_id}
+    return {"message": "Analysis scheduled", "stream_id": stream_id}
+@router.get("/{stream_id}/timeline")
+async def get_stream_timeline(stream_id: str, current_user: dict = Depends(get_current_user)):
+    """Stored per-window accident confidences and whether they match the loaded weights"""
+    db = await get_database()
+    stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    analysis = stream.get("analysis")
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Stream has not been analyzed")
+    analysis["current"] = await timeline_is_current(stream_id)
+    return analysis
+@router.get("/", response_model=List[StreamModel], response_model_exclude={"__all__": {"analysis": {"scores"}}})
 async def list_streams(current_user: dict = Depends(get_current_user)):
+    # Score timelines can hold thousands of windows; they are served by /{stream_id}/timeline
     db = await get_database()
-    streams = await db["streams"].find().to_list(1000)
+    streams = await db["streams"].find({}, {"analysis.scores": 0}).to_list(1000)
     return streams
 @router.patch("/{stream_id}/stop")
 async def stop_stream(stream_id: str, current_user: dict = Depends(get_current_user)):
@@ -80,9 +163,14 @@ async def delete_stream(stream_id: str, current_user: dict = Depends(get_current
     stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
-    if os.path.exists(stream["video_path"]):
-        os.remove(stream["video_path"])
     result = await db["streams"].delete_one({"_id": ObjectId(stream_id)})
+    # Deduplicated uploads share one file; only remove it with its last stream
+    still_used = await db["streams"].count_documents({"video_path": stream["video_path"]})
+    if not still_used:
+        mezzanine_path = (stream.get("mezzanine") or {}).get("path")
+        for path in (stream["video_path"], mezzanine_path):
+            if path and os.path.exists(path):
+                os.remove(path)
     return {"message": "Stream deleted successfully"}
 
 @router.delete("/all/delete")
@@ -90,13 +178,15 @@ async def delete_all_streams(current_user: dict = Depends(get_current_admin_user
     db = await get_database()
     streams = await db["streams"].find().to_list(1000)
     
-    # Delete all files
-    for stream in streams:
-        if "video_path" in stream and os.path.exists(stream["video_path"]):
+    # Delete all files (deduplicated uploads share a path, so remove each once)
+    paths = {stream["video_path"] for stream in streams if "video_path" in stream}
+    paths |= {(stream.get("mezzanine") or {}).get("path") for stream in streams} - {None}
+    for video_path in paths:
+        if os.path.exists(video_path):
             try:
-                os.remove(stream["video_path"])
+                os.remove(video_path)
             except Exception as e:
-                print(f"Error deleting file {stream['video_path']}: {e}")
+                print(f"Error deleting file {video_path}: {e}")
                 
     # Delete all records
     await db["streams"].delete_many({})
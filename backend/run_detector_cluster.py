@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Run a local detector cluster for testing sharding: N detector nodes
+(PROCESS_ROLE=detector, SHARDING_ENABLED=true, HTTP on --http-port+1..N,
+IPC on --ipc-port+0..N-1) and one API-role process on --http-port, all
+against the MONGO_URI of backend/.env. For a plain local mongod set
+MONGO_URI=mongodb://localhost:27017 and MONGO_TLS=false.
+
+Camera ownership is printed whenever it changes. Stop a node with
+"kill <pid>" (graceful: its leases are freed) or "kill -9 <pid>" (its
+leases expire after LEASE_TTL_SECONDS) and watch its cameras move.
+
+    MONGO_TLS=false python backend/run_detector_cluster.py --nodes 3
+
+Nodes on several hosts bind DETECTOR_IPC_HOST (e.g. 0.0.0.0) and set
+DETECTOR_ADVERTISED_HOST to an address the other hosts can reach.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import db
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def spawn(role: str, http_port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(http_port)],
+        cwd=ROOT, env={**os.environ, **env, "PROCESS_ROLE": role}
+    )
+
+
+async def watch(interval: float):
+    await db.connect_to_database()
+    previous = None
+    try:
+        while True:
+            leases = await db.db["detector_leases"].find().to_list(None)
+            nodes = await db.db["detector_nodes"].find().to_list(None)
+            ownership = {node["_id"]: sorted(l["_id"] for l in leases if l["node_id"] == node["_id"]) for node in nodes}
+            if ownership != previous:
+                print(f"🧩 {len(leases)} leased cameras on {len(nodes)} nodes")
+                for node_id, cameras in sorted(ownership.items()):
+                    print(f"   {node_id:<28} {len(cameras):>3}  {', '.join(cameras)}")
+                previous = ownership
+            await asyncio.sleep(interval)
+    finally:
+        await db.close_database_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=2)
+    parser.add_argument("--http-port", type=int, default=8000, help="API process port; nodes use the next ones")
+    parser.add_argument("--ipc-port", type=int, default=6001)
+    parser.add_argument("--no-api", action="store_true", help="Only start the detector nodes")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between ownership checks")
+    args = parser.parse_args()
+
+    processes = {}
+    for i in range(args.nodes):
+        node_id = f"node-{i + 1}"
+        processes[node_id] = spawn("detector", args.http_port + 1 + i, {
+            "SHARDING_ENABLED": "true",
+            "DETECTOR_NODE_ID": node_id,
+            "DETECTOR_IPC_PORT": str(args.ipc_port + i),
+        })
+        print(f"🚀 {node_id}: pid {processes[node_id].pid}, http {args.http_port + 1 + i}, ipc {args.ipc_port + i}")
+    if not args.no_api:
+        processes["api"] = spawn("api", args.http_port, {"SHARDING_ENABLED": "true"})
+        print(f"🚀 api: pid {processes['api'].pid}, http {args.http_port}")
+
+    try:
+        asyncio.run(watch(args.interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("🛑 Stopping cluster...")
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,149 @@ import tensorflow as tf
 from tensorflow.keras import layers, models
 import numpy as np
 import cv2
-from collections import deque
 from pathlib import Path
 import asyncio
+import hashlib
+import os
+import shutil
 
-from typing import Optional, Dict
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple
 import logging
 
+from ..config import settings
+from .inference_backends import InferenceBackend, KerasBackend, create_backend, inference_graphs
+
 logger = logging.getLogger(__name__)
 
+class FeatureRing:
+    """
+    Rolling (sequence_length, feature_dim) store of per-frame CNN embeddings.
+    Each frame is embedded once and reused by every window it belongs to.
+    """
+    def __init__(self, sequence_length: int, feature_dim: int):
+        self.features = np.zeros((sequence_length, feature_dim), dtype=np.float32)
+        self.sequence_length = sequence_length
+        self.index = 0   # Next slot to write
+        self.count = 0   # Number of valid slots
+
+    def push(self, feature: np.ndarray):
+        self.features[self.index] = feature
+        self.index = (self.index + 1) % self.sequence_length
+        self.count = min(self.count + 1, self.sequence_length)
+
+    def is_full(self) -> bool:
+        return self.count >= self.sequence_length
+
+    def clear(self):
+        """Forget the buffered window (the next one is filled from scratch)"""
+        self.index = 0
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.features.nbytes
+
+    def ordered(self) -> np.ndarray:
+        """Return the window oldest-first (a fresh 16x2048 copy, safe to hand to another thread)"""
+        return np.roll(self.features, -self.index, axis=0)
+
+class FrameRing:
+    """
+    Preallocated per-camera ring of model-ready frames.
+
+    Frames are stored as uint8 (a quarter of float32) and resized straight
+    into their slot; the float cast happens inside the inference graph.
+    ordered() writes the window oldest-first into a reused snapshot tensor,
+    so the hot loop allocates nothing per frame or per prediction.
+    """
+    def __init__(self, sequence_length: int, height: int, width: int):
+        self.sequence_length = sequence_length
+        self.height = height
+        self.width = width
+        self.frames = np.zeros((sequence_length, height, width, 3), dtype=np.uint8)
+        # Ordered copy handed to the model; only rewritten once the previous prediction finished
+        self.snapshot = np.empty_like(self.frames)
+        self.index = 0   # Next slot to write
+        self.count = 0   # Number of valid slots
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames.nbytes + self.snapshot.nbytes
+
+    def __len__(self):
+        return self.count
+
+    def push(self, frame: np.ndarray):
+        """Resize a raw BGR frame into the next slot (keep BGR, same as training)"""
+        cv2.resize(frame, (self.width, self.height), dst=self.frames[self.index])
+        self.index = (self.index + 1) % self.sequence_length
+        self.count = min(self.count + 1, self.sequence_length)
+
+    def ordered(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write the window oldest-first into out (default: the reused snapshot) and return it"""
+        if out is None:
+            out = self.snapshot
+        tail = self.sequence_length - self.index
+        out[:tail] = self.frames[self.index:]
+        out[tail:] = self.frames[:self.index]
+        return out
+
+def _file_hash(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    LRU cache of window predictions for file sources, keyed by
+    (content key, window start frame, sequence length, model version).
+    A looped file yields the same windows every pass, so later passes are
+    served from here instead of the model.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[tuple, Tuple[bool, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[bool, float]]:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: tuple, result: Tuple[bool, float]):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
 class AccidentDetectionService:
     def __init__(self):
         self.model = None
@@ -18,7 +152,30 @@ class AccidentDetectionService:
         self.image_height = 224    # Updated to match model requirement
         self.image_width = 224     # Updated to match model requirement
         self.active_detections: Dict[str, bool] = {}
-        self.frame_buffers: Dict[str, deque] = {}
+        self.frame_buffers: Dict[str, FrameRing] = {}
+        # Embedding inference mode: per-frame backbone + LSTM/Dense head
+        self.backbone = None
+        self.head = None
+        # Compiled forward passes taking uint8 frames; the float32 cast runs in-graph
+        self._forward_sequences = None
+        self._forward_frames = None
+        self._forward_head = None
+        self.feature_dim = 2048    # ResNet50 global-average-pooled output
+        self.feature_rings: Dict[str, FeatureRing] = {}
+        self._batch_buffer: Optional[np.ndarray] = None  # Reused stacking buffer for multi-camera batches
+        self.model_path = Path(__file__).parent.parent / "aiModel" / "accident_detector_cnn_lstm.keras"
+        self.confidence_threshold = 0.5
+        self._model_version: Optional[str] = None
+        self.prediction_cache = PredictionCache(settings.PREDICTION_CACHE_SIZE)
+        # Cascade first stage: small screening model, optional (needs its own trained weights)
+        self.screener = None
+        self.screener_path = self.model_path.parent / "accident_screener.keras"
+        self._forward_screen = None
+        self._screener_version: Optional[str] = None
+        # Runtime that executes the graphs (Keras, ONNX Runtime or TFLite); see INFERENCE_BACKEND
+        self.backend: Optional[InferenceBackend] = None
+        # With INFERENCE_WORKERS > 0 the model only lives in worker processes (set by InferenceScheduler)
+        self.pool = None
         
     def build_cnn_lstm_model(self):
         """
@@ -57,11 +214,28 @@ class AccidentDetectionService:
         # model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
         return model
 
-    def load_model(self):
-        """Load the pre-trained accident detection model weights"""
+    def load_model(self, use_cache: bool = True):
+        """
+        Load the pre-trained accident detection model weights.
+        With use_cache, the compiled inference graphs saved by an earlier boot
+        are restored instead (no architecture reconstruction); they have no
+        Keras layers, so tools that export or distill the model pass
+        use_cache=False.
+        """
         if self.model is None:
+            self.load_versions()
+            cache_dir = self.graph_cache_dir()
+            if use_cache and settings.MODEL_CACHE_ENABLED and cache_dir.exists():
+                try:
+                    self.load_cached_graphs(cache_dir)
+                    self.load_backend()
+                    self.load_screener()
+                    return
+                except Exception as e:
+                    logger.warning(f"Cached model graphs at {cache_dir} unusable, rebuilding: {e}")
+                    self.model = None
             try:
-                model_path = Path(__file__).parent.parent / "aiModel" / "accident_detector_cnn_lstm.keras"
+                model_path = self.model_path
                 logger.info(f"Building model architecture...")
                 self.model = self.build_cnn_lstm_model()
                 
@@ -70,61 +244,311 @@ class AccidentDetectionService:
                 self.model.load_weights(str(model_path))
                 
                 logger.info("Model weights loaded successfully")
+
+                self.build_inference_heads()
             except Exception as e:
                 logger.error(f"Error loading model: {e}")
                 raise
+            if use_cache and settings.MODEL_CACHE_ENABLED:
+                self.save_cached_graphs(cache_dir)
+            self.load_backend()
+            self.load_screener()
+
+    def graph_cache_dir(self) -> Path:
+        """Per-weights directory of the saved inference graphs"""
+        return self.model_path.parent / "cache" / self.weights_version
+
+    def save_cached_graphs(self, cache_dir: Path):
+        """Save the uint8-input inference graphs as a SavedModel for faster later boots"""
+        module = tf.Module()
+        for name, fn in inference_graphs(self).items():
+            setattr(module, name, fn)
+        # Pool workers may all build on the first boot; each writes its own copy, the first rename wins
+        partial = cache_dir.with_name(f"{cache_dir.name}.partial-{os.getpid()}")
+        try:
+            tf.saved_model.save(module, str(partial))
+            partial.rename(cache_dir)
+            logger.info(f"Saved inference graphs to {cache_dir}")
+        except Exception as e:
+            logger.warning(f"Could not cache inference graphs: {e}")
+            shutil.rmtree(partial, ignore_errors=True)
+
+    def load_cached_graphs(self, cache_dir: Path):
+        logger.info(f"Restoring inference graphs from {cache_dir}")
+        restored = tf.saved_model.load(str(cache_dir))
+        self.model = restored
+        self._forward_sequences = restored.sequence
+        self._forward_frames = restored.backbone
+        self._forward_head = restored.head
+        logger.info("Inference graphs restored")
+
+    def warmup(self, batch_sizes: List[int]):
+        """
+        Run dummy batches through every graph at each batch size so tracing
+        and kernel selection happen before the first real prediction.
+        """
+        steps, height, width = self.sequence_length, self.image_height, self.image_width
+        for size in sorted(set(batch_sizes)):
+            sequences = np.zeros((size, steps, height, width, 3), dtype=np.uint8)
+            self.backend.predict_sequences(sequences)
+            self.backend.embed_frames(np.zeros((size, height, width, 3), dtype=np.uint8))
+            self.backend.predict_features(np.zeros((size, steps, self.feature_dim), dtype=np.float32))
+            if self.has_screener:
+                self._forward_screen(sequences)
+        logger.info(f"Model warmed up at batch sizes {sorted(set(batch_sizes))}")
+
+    def load_backend(self):
+        """Select the runtime for the model graphs, falling back to Keras if the export is unusable"""
+        try:
+            self.backend = create_backend(settings.INFERENCE_BACKEND, self, variant=settings.INFERENCE_MODEL_VARIANT)
+        except Exception as e:
+            logger.error(f"Cannot use inference backend '{settings.INFERENCE_BACKEND}', falling back to keras: {e}")
+            self.backend = KerasBackend(self)
+        logger.info(f"Inference backend: {self.backend.name} ({getattr(self.backend, 'variant', 'float32')})")
+
+    def build_screening_model(self):
+        """
+        Lightweight first stage of the cascade: MobileNetV3-Small on
+        downscaled frames followed by a small GRU. Trained by distillation
+        from the CNN-LSTM (see train_screener.py).
+        """
+        size = settings.CASCADE_SCREEN_SIZE
+        cnn_base = tf.keras.applications.MobileNetV3Small(
+            input_shape=(size, size, 3), include_top=False, weights=None,
+            pooling='avg', minimalistic=True
+        )
+        return models.Sequential([
+            layers.Input(shape=(self.sequence_length, size, size, 3)),
+            layers.TimeDistributed(cnn_base),
+            layers.GRU(64, return_sequences=False),
+            layers.Dense(2, activation='softmax')
+        ])
+
+    def load_screener(self):
+        """Load the screening model if its weights exist; without it the cascade stays off"""
+        if self.screener is not None:
+            return
+        if not self.screener_path.exists():
+            logger.info(f"No screening model at {self.screener_path}; cascade disabled")
+            return
+        try:
+            screener = self.build_screening_model()
+            screener.load_weights(str(self.screener_path))
+        except Exception as e:
+            logger.error(f"Error loading screening model: {e}")
+            return
+
+        size = settings.CASCADE_SCREEN_SIZE
+        height, width = self.image_height, self.image_width
+
+        @tf.function(reduce_retracing=True)
+        def forward_screen(batch):
+            # (N, T, H, W, 3) uint8 -> downscale every frame in-graph
+            frames = tf.reshape(tf.cast(batch, tf.float32), (-1, height, width, 3))
+            frames = tf.image.resize(frames, (size, size), method="area")
+            return screener(tf.reshape(frames, (-1, self.sequence_length, size, size, 3)), training=False)
+
+        self.screener = screener
+        self._forward_screen = forward_screen
+        logger.info(f"Screening model loaded from {self.screener_path}")
+
+    @property
+    def has_screener(self) -> bool:
+        return self._forward_screen is not None
     
+    @property
+    def model_version(self) -> str:
+        """
+        Short hash of the weights file. Stored results (score timelines,
+        cached predictions) carry it so they are ignored once weights change.
+        """
+        if self.backend is not None:
+            variant = getattr(self.backend, "variant", "float32")
+        else:
+            # Not loaded in this process (inference pool): the workers use the configured variant
+            variant = settings.INFERENCE_MODEL_VARIANT if settings.INFERENCE_BACKEND == "tflite" else "float32"
+        # Quantized graphs give (slightly) different scores than the weights they came from
+        return self.weights_version if variant == "float32" else f"{self.weights_version}-{variant}"
+
+    def load_versions(self):
+        """
+        Hash the weight files once (blocking: run by load_model, or by the
+        scheduler in pool mode, off the event loop); the version properties
+        then only read the stored hashes.
+        """
+        self._model_version = _file_hash(self.model_path)
+        self._screener_version = _file_hash(self.screener_path) if self.screener_path.exists() else None
+
+    @property
+    def weights_version(self) -> str:
+        """Short hash of the weights file alone (exported graphs record the one they came from)"""
+        if self._model_version is None:
+            self.load_versions()
+        return self._model_version
+
+    @property
+    def screener_version(self) -> Optional[str]:
+        """Short hash of the screening weights, None when there are none"""
+        if self._model_version is None:
+            self.load_versions()
+        return self._screener_version
+
+    def build_inference_heads(self):
+        """
+        Split the loaded model into a per-frame backbone and a sequence head.
+
+        The data augmentation layer is a no-op at inference, so
+        backbone(frame) for each frame followed by head(features) gives the
+        same scores as the full model while letting overlapping windows share
+        frame embeddings. Both parts share weights with self.model.
+        """
+        # model.layers: [TimeDistributed(augmentation), TimeDistributed(ResNet50), LSTM, Dense, Dropout, Dense]
+        self.backbone = self.model.layers[1].layer
+        self.head = models.Sequential(
+            [layers.Input(shape=(self.sequence_length, self.feature_dim))] + self.model.layers[2:]
+        )
+        logger.info("Backbone/head split ready for embedding inference")
+
+        model, backbone = self.model, self.backbone
+
+        @tf.function(reduce_retracing=True)
+        def forward_sequences(batch):
+            return model(tf.cast(batch, tf.float32), training=False)
+
+        @tf.function(reduce_retracing=True)
+        def forward_frames(batch):
+            return backbone(tf.cast(batch, tf.float32), training=False)
+
+        @tf.function(reduce_retracing=True)
+        def forward_head(batch):
+            return self.head(batch, training=False)
+
+        self._forward_sequences = forward_sequences
+        self._forward_frames = forward_frames
+        self._forward_head = forward_head
+
     def preprocess_frame(self, frame):
         """Preprocess a single frame for the model.
         
         IMPORTANT: During training, the data generator simply resized BGR frames 
         and cast to float (no preprocess_input, no BGR→RGB conversion).
         We must match that exact preprocessing here for correct predictions.
+        The frame stays uint8; the float cast is done inside the inference graph.
         """
         # Resize frame to the required size (keep BGR, same as training)
-        resized_frame = cv2.resize(frame, (self.image_height, self.image_width))
-        # Cast to float32 (training used float16 for memory, float32 is fine for inference)
-        preprocessed_frame = resized_frame.astype(np.float32)
-        return preprocessed_frame
+        return cv2.resize(frame, (self.image_width, self.image_height))
     
     
-    def predict_accident(self, frames_buffer: deque) -> tuple[bool, float]:
+    def new_frame_ring(self) -> FrameRing:
+        return FrameRing(self.sequence_length, self.image_height, self.image_width)
+
+    def predict_accident(self, frames_buffer: FrameRing) -> tuple[bool, float]:
         """
         Predict if an accident occurred in the frame sequence
         Returns: (is_accident, confidence)
         """
         if len(frames_buffer) < self.sequence_length:
             return False, 0.0
+        if self.backend is None and self.pool is None:
+            raise RuntimeError("Model not loaded")
         
         try:
-            # Get the last sequence_length frames
-            frames = list(frames_buffer)[-self.sequence_length:]
-            
-            # Stack frames into a sequence
-            sequence = np.array(frames)
-            
-            # Add batch dimension
-            sequence = np.expand_dims(sequence, axis=0)
-            
-            # Make prediction
-            prediction = self.model.predict(sequence, verbose=0)
+            # Ordered view of the last sequence_length frames
+            sequence = frames_buffer.ordered()
+            if self.backend is None:
+                # Pool mode: no model in this process, a worker runs the same batch method
+                return self.pool.run("predict_batch", [sequence])[0]
+            return self.predict_batch([sequence])[0]
             
+        except Exception as e:
+            logger.error(f"Error during prediction: {e}")
+            return False, 0.0
+
+    def _stack_batch(self, sequences: List[np.ndarray]) -> np.ndarray:
+        """Stack sequences into a batch without allocating a new tensor per call"""
+        if len(sequences) == 1:
+            return sequences[0][np.newaxis]
+        shape = (len(sequences),) + sequences[0].shape
+        buffer = self._batch_buffer
+        if (buffer is None or buffer.shape[0] < shape[0] or
+                buffer.shape[1:] != shape[1:] or buffer.dtype != sequences[0].dtype):
+            buffer = np.empty(shape, dtype=sequences[0].dtype)
+            self._batch_buffer = buffer
+        return np.stack(sequences, out=buffer[:shape[0]])
+
+    def predict_batch(self, sequences: List[np.ndarray]) -> List[tuple[bool, float]]:
+        """
+        Run one forward pass over several (sequence_length, H, W, 3) sequences.
+        Returns one (is_accident, confidence) per sequence, in order.
+        """
+        batch = self._stack_batch(sequences)
+
+        # Make prediction
+        predictions = self.backend.predict_sequences(batch)
+        return self._interpret_predictions(predictions)
+
+    def screen_batch(self, sequences: List[np.ndarray]) -> List[float]:
+        """
+        First cascade stage: accident score of each (sequence_length, H, W, 3)
+        sequence from the screening model. No threshold is applied here.
+        """
+        batch = self._stack_batch(sequences)
+        predictions = self._forward_screen(batch).numpy()
+        return [float(prediction[1]) for prediction in predictions]
+
+    def embed_frames(self, frames: List[np.ndarray]) -> np.ndarray:
+        """
+        Run the CNN backbone over a batch of preprocessed frames.
+        Returns a (len(frames), feature_dim) array of embeddings.
+        """
+        batch = np.stack(frames)
+        return self.backend.embed_frames(batch)
+
+    def predict_features_batch(self, feature_sequences: List[np.ndarray]) -> List[tuple[bool, float]]:
+        """
+        Run only the LSTM+Dense head over (sequence_length, feature_dim) embedding windows.
+        Returns one (is_accident, confidence) per window, in order.
+        """
+        batch = np.stack(feature_sequences)
+        predictions = self.backend.predict_features(batch)
+        return self._interpret_predictions(predictions)
+
+    def _cache_key(self, content_key: str, start_frame: int, cascade: bool) -> tuple:
+        # Windows the cascade did not escalate were scored by the screener, so its weights count too;
+        # results of the full model alone (cascade=False) are kept apart from those
+        screener = self.screener_version if cascade and settings.CASCADE_ENABLED else None
+        return (content_key, start_frame, self.sequence_length, self.model_version, screener)
+
+    def cached_prediction(self, content_key: str, start_frame: int, cascade: bool = True) -> Optional[Tuple[bool, float]]:
+        """Earlier result for the window of a file starting at start_frame, if still cached for the same path (cascade or full model)"""
+        return self.prediction_cache.get(self._cache_key(content_key, start_frame, cascade))
+
+    def cache_prediction(self, content_key: str, start_frame: int, future: asyncio.Future, cascade: bool = True):
+        """Store the result of a pending prediction for that window once it resolves"""
+        key = self._cache_key(content_key, start_frame, cascade)
+
+        def store(done: asyncio.Future):
+            if not done.cancelled() and done.exception() is None:
+                self.prediction_cache.put(key, done.result())
+
+        future.add_done_callback(store)
+
+    def _interpret_predictions(self, predictions) -> List[tuple[bool, float]]:
+        results = []
+        for prediction in predictions:
             # Index 0 = Normal, Index 1 = Accident
-            normal_conf = float(prediction[0][0])
-            accident_conf = float(prediction[0][1])
+            normal_conf = float(prediction[0])
+            accident_conf = float(prediction[1])
 
             confidence = accident_conf
 
             # Threshold for accident detection
-            is_accident = confidence > 0.5
+            is_accident = confidence > self.confidence_threshold
 
             logger.info(f"Prediction - Normal: {normal_conf:.4f}, Accident: {accident_conf:.4f}, Triggered: {is_accident}")
-            
-            return is_accident, confidence
-            
-        except Exception as e:
-            logger.error(f"Error during prediction: {e}")
-            return False, 0.0
+            results.append((is_accident, confidence))
+
+        return results
     
     async def start_detection(self, camera_id: str, camera_url: str) -> bool:
         """Start accident detection for a camera"""
@@ -132,12 +556,12 @@ class AccidentDetectionService:
             logger.warning(f"Detection already active for camera {camera_id}")
             return False
         
-        # Ensure model is loaded
-        if self.model is None:
-            self.load_model()
-        
+        # The model is loaded off the event loop by InferenceScheduler.ensure_model;
+        # callers check inference_scheduler.is_ready first
+
         # Initialize frame buffer for this camera
-        self.frame_buffers[camera_id] = deque(maxlen=self.sequence_length)
+        self.frame_buffers[camera_id] = self.new_frame_ring()
+        self.feature_rings[camera_id] = FeatureRing(self.sequence_length, self.feature_dim)
         self.active_detections[camera_id] = True
         
         logger.info(f"Started detection for camera {camera_id}")
@@ -149,10 +573,23 @@ class AccidentDetectionService:
             self.active_detections[camera_id] = False
             if camera_id in self.frame_buffers:
                 del self.frame_buffers[camera_id]
+            self.feature_rings.pop(camera_id, None)
             logger.info(f"Stopped detection for camera {camera_id}")
             return True
         return False
     
+    def get_memory_report(self, camera_id: str) -> dict:
+        """Bytes held by the model-side buffers of one camera"""
+        frame_ring = self.frame_buffers.get(camera_id)
+        feature_ring = self.feature_rings.get(camera_id)
+        report = {
+            "frame_ring_bytes": frame_ring.nbytes if frame_ring is not None else 0,
+            "frame_dtype": str(frame_ring.frames.dtype) if frame_ring is not None else None,
+            "feature_ring_bytes": feature_ring.nbytes if feature_ring is not None else 0,
+        }
+        report["total_bytes"] = report["frame_ring_bytes"] + report["feature_ring_bytes"]
+        return report
+
     def is_detection_active(self, camera_id: str) -> bool:
         """Check if detection is active for a camera"""
         return self.active_detections.get(camera_id, False)
@@ -165,14 +602,11 @@ class AccidentDetectionService:
         if not self.is_detection_active(camera_id):
             return False, 0.0
 
-        # Preprocess the frame
-        processed_frame = self.preprocess_frame(frame)
-
-        # Add to buffer
+        # Resize into the camera's ring buffer
         if camera_id not in self.frame_buffers:
-            self.frame_buffers[camera_id] = deque(maxlen=self.sequence_length)
+            self.frame_buffers[camera_id] = self.new_frame_ring()
 
-        self.frame_buffers[camera_id].append(processed_frame)
+        self.frame_buffers[camera_id].push(frame)
 
         # Only predict when we have enough frames
         if len(self.frame_buffers[camera_id]) >= self.sequence_length:
@@ -0,0 +1,234 @@
+import cv2
+import os
+import asyncio
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+from bson import ObjectId
+
+from ..config import settings
+from ..database import get_database
+from ..models import get_pkt_now
+from .accident_detection_service import accident_detection_service
+from .inference_scheduler import inference_scheduler
+from .transcode_service import playback_source
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreTimeline:
+    """
+    Stored per-window accident confidences of one file. Window k covers the
+    sequence_length frames ending at frame first_frame + k * stride.
+    """
+
+    def __init__(self, analysis: dict):
+        self.stride = analysis["stride"]
+        self.sequence_length = analysis["sequence_length"]
+        self.first_frame = analysis["first_frame"]
+        self.scores: List[float] = analysis["scores"]
+
+    def window_at(self, frame_index: int) -> Optional[int]:
+        """
+        The latest window ending at or before frame_index, or None before the
+        first one. Frames may be skipped (per-camera target_fps), so windows are
+        not looked up by exact end frame.
+        """
+        offset = frame_index - self.first_frame
+        if offset < 0 or not self.scores:
+            return None
+        return min(offset // self.stride, len(self.scores) - 1)
+
+
+def _read_chunk(cap, count: int) -> List[np.ndarray]:
+    """Decode and preprocess up to count frames (blocking)"""
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(accident_detection_service.preprocess_frame(frame))
+    return frames
+
+
+class AnalysisService:
+    """
+    Runs the model once over an uploaded video, unpaced and batched through
+    the shared inference scheduler, and stores the resulting score timeline
+    on the stream document ("analysis"). File-backed cameras replay the
+    timeline instead of re-inferring every pass while its model_version
+    matches the loaded weights.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def is_running(self, stream_id: str) -> bool:
+        return stream_id in self._tasks
+
+    async def schedule(self, stream_id: str) -> bool:
+        """Start an analysis of the stream; False if one is already running"""
+        if stream_id in self._tasks:
+            return False
+        db = await get_database()
+        await db["streams"].update_one(
+            {"_id": ObjectId(stream_id)},
+            {"$set": {"analysis": {"status": "pending", "progress": 0.0, "model_version": None, "error": None}}}
+        )
+        self._tasks[stream_id] = asyncio.create_task(self._run(stream_id))
+        return True
+
+    async def _wait_for_source(self, stream_id: str) -> Optional[dict]:
+        """Wait out a pending mezzanine so frame indices match what detection will decode"""
+        db = await get_database()
+        while True:
+            stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
+            if stream is None:
+                return None
+            mezzanine = stream.get("mezzanine") or {}
+            if not (settings.MEZZANINE_USE_FOR_PIPELINE and mezzanine.get("status") in ("pending", "running")):
+                return stream
+            await asyncio.sleep(2.0)
+
+    async def _reuse_existing(self, stream: dict, source_path: str, model_version: str) -> Optional[dict]:
+        """A stream with the same bytes already analyzed on the same file and weights"""
+        if not stream.get("content_hash"):
+            return None
+        db = await get_database()
+        existing = await db["streams"].find_one({
+            "content_hash": stream["content_hash"],
+            "analysis.status": "done",
+            "analysis.model_version": model_version,
+            "analysis.source_path": source_path,
+            "_id": {"$ne": stream["_id"]}
+        })
+        return existing["analysis"] if existing else None
+
+    async def _run(self, stream_id: str):
+        db = await get_database()
+        stream_filter = {"_id": ObjectId(stream_id)}
+        loop = asyncio.get_running_loop()
+        cap = None
+        next_chunk = None
+        try:
+            stream = await self._wait_for_source(stream_id)
+            if stream is None:
+                return
+            source_path, metadata = playback_source(stream)
+            source_path = os.path.normpath(source_path)
+
+            await loop.run_in_executor(None, inference_scheduler.ensure_model)
+            model_version = await loop.run_in_executor(None, lambda: accident_detection_service.model_version)
+
+            existing = await self._reuse_existing(stream, source_path, model_version)
+            if existing is not None:
+                await db["streams"].update_one(stream_filter, {"$set": {"analysis": existing}})
+                logger.info(f"Reused score timeline for stream {stream_id}")
+                return
+
+            await db["streams"].update_one(stream_filter, {"$set": {"analysis.status": "running"}})
+            cap = await loop.run_in_executor(None, cv2.VideoCapture, source_path)
+            if not cap.isOpened():
+                raise RuntimeError(f"Cannot open {source_path}")
+            frame_total = (metadata or {}).get("frame_count") or int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+            sequence_length = accident_detection_service.sequence_length
+            stride = max(1, settings.ANALYSIS_STRIDE)
+            first_frame = sequence_length - 1
+            features = np.zeros((sequence_length, accident_detection_service.feature_dim), dtype=np.float32)
+            scores: List[float] = []
+            key = f"analysis:{stream_id}"
+            chunk_size = inference_scheduler.max_batch_size
+            frame_index = 0
+            reported = 0.0
+
+            # Decode the next chunk while the current one is in the model
+            next_chunk = loop.run_in_executor(None, _read_chunk, cap, chunk_size)
+            while True:
+                frames = await next_chunk
+                if not frames:
+                    break
+                next_chunk = loop.run_in_executor(None, _read_chunk, cap, chunk_size)
+
+                # Each frame is embedded once; overlapping windows only re-run the LSTM head
+                embeddings = await asyncio.gather(*[inference_scheduler.embed(key, f) for f in frames])
+                windows = []
+                for embedding in embeddings:
+                    features[:-1] = features[1:]
+                    features[-1] = embedding
+                    if frame_index >= first_frame and (frame_index - first_frame) % stride == 0:
+                        windows.append(inference_scheduler.submit_features(key, features.copy()))
+                    frame_index += 1
+                for _, confidence in await asyncio.gather(*windows):
+                    scores.append(round(confidence, 4))
+
+                if frame_total:
+                    progress = min(0.99, frame_index / frame_total)
+                    if progress - reported >= 0.02:
+                        reported = progress
+                        await db["streams"].update_one(stream_filter, {"$set": {"analysis.progress": round(progress, 3)}})
+
+            analysis = {
+                "status": "done",
+                "progress": 1.0,
+                "model_version": model_version,
+                "source_path": source_path,
+                "sequence_length": sequence_length,
+                "stride": stride,
+                "first_frame": first_frame,
+                "frame_count": frame_index,
+                "fps": (metadata or {}).get("fps"),
+                "scores": scores,
+                "max_score": max(scores, default=0.0),
+                "completed_at": get_pkt_now(),
+                "error": None,
+            }
+            await db["streams"].update_one(stream_filter, {"$set": {"analysis": analysis}})
+            logger.info(f"Analysis done for stream {stream_id}: {frame_index} frames, {len(scores)} windows, "
+                        f"max confidence {analysis['max_score']:.3f}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analysis failed for stream {stream_id}: {e}")
+            await db["streams"].update_one(stream_filter, {"$set": {"analysis.status": "failed", "analysis.error": str(e)}})
+        finally:
+            self._tasks.pop(stream_id, None)
+            if cap is not None:
+                if next_chunk is not None and not next_chunk.done():
+                    # A read is still running on the capture; release it after
+                    next_chunk.add_done_callback(lambda _: cap.release())
+                else:
+                    cap.release()
+
+    async def load_timeline(self, stream: dict, source_path: str) -> Optional[ScoreTimeline]:
+        """
+        The stream's stored timeline if it was computed on source_path with the
+        currently loaded weights; None means detection has to infer live.
+        """
+        analysis = stream.get("analysis") or {}
+        if analysis.get("status") != "done":
+            return None
+        if analysis.get("source_path") != os.path.normpath(source_path):
+            return None
+        loop = asyncio.get_running_loop()
+        model_version = await loop.run_in_executor(None, lambda: accident_detection_service.model_version)
+        if analysis.get("model_version") != model_version:
+            logger.info(f"Score timeline of stream {stream['_id']} is from other weights, ignoring it")
+            return None
+        return ScoreTimeline(analysis)
+
+    async def timeline_is_current(self, stream_id: str) -> bool:
+        db = await get_database()
+        stream = await db["streams"].find_one({"_id": ObjectId(stream_id)})
+        if not stream:
+            return False
+        source_path, _ = playback_source(stream)
+        return await self.load_timeline(stream, source_path) is not None
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+# Global instance
+analysis_service = AnalysisService()
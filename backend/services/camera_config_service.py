@@ -0,0 +1,104 @@
+import time
+import logging
+from typing import NamedTuple, Optional
+from bson import ObjectId
+from pydantic import ValidationError
+
+from ..config import settings
+from ..database import get_database
+from ..models import CameraPipelineConfig
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineTuning(NamedTuple):
+    """A camera's pipeline config resolved against its source fps and the global settings"""
+    frame_step: float             # Source frames per processed frame (1.0 = every frame)
+    fps: float                    # Processed frames per second
+    predict_every: int
+    detection_threshold: int
+    cooldown_frames: int
+    pre_trigger_seconds: float
+    post_capture_frames: int
+    confidence_threshold: float
+
+
+class ConfigWatcher:
+    """One camera's pipeline config, re-read from its document at most every CAMERA_CONFIG_POLL_SECONDS"""
+
+    def __init__(self, camera_id: str, config: CameraPipelineConfig):
+        self.camera_id = camera_id
+        self.config = config
+        self._checked_at = time.monotonic()
+
+    async def poll(self) -> Optional[CameraPipelineConfig]:
+        """The new config if it changed since the last check, else None (cheap when no check is due)"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.CAMERA_CONFIG_POLL_SECONDS:
+            return None
+        self._checked_at = now
+        db = await get_database()
+        camera = await db["cameras"].find_one({"_id": ObjectId(self.camera_id)}, {"pipeline": 1})
+        if camera is None:
+            return None
+        config = camera_config_service.get_config(camera)
+        if config == self.config:
+            return None
+        self.config = config
+        return config
+
+
+class CameraConfigService:
+    """Per-camera pipeline tuning stored on the camera document ("pipeline")"""
+
+    def get_config(self, camera: dict) -> CameraPipelineConfig:
+        """The camera's stored config; a missing or invalid one falls back to the defaults"""
+        # Fields dropped from the model since the document was written are ignored
+        stored = {k: v for k, v in (camera.get("pipeline") or {}).items() if k in CameraPipelineConfig.model_fields}
+        try:
+            return CameraPipelineConfig(**stored)
+        except ValidationError as e:
+            logger.warning(f"Invalid pipeline config on camera {camera.get('_id')}, using defaults: {e}")
+            return CameraPipelineConfig()
+
+    def resolve(self, config: CameraPipelineConfig, source_fps: float, embedding_mode: bool) -> PipelineTuning:
+        source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        frame_step = max(1.0, source_fps / config.target_fps) if config.target_fps else 1.0
+        fps = source_fps / frame_step
+        if config.predict_every is not None:
+            predict_every = config.predict_every
+        else:
+            predict_every = max(1, settings.EMBEDDING_PREDICT_EVERY) if embedding_mode else 16
+        return PipelineTuning(
+            frame_step=frame_step,
+            fps=fps,
+            predict_every=predict_every,
+            detection_threshold=config.detection_threshold,
+            cooldown_frames=config.cooldown_period,
+            pre_trigger_seconds=(settings.SNIPPET_PRE_TRIGGER_SECONDS if config.pre_trigger_seconds is None
+                                 else config.pre_trigger_seconds),
+            post_capture_frames=int(fps * config.post_trigger_seconds),
+            confidence_threshold=config.confidence_threshold,
+        )
+
+    async def watch(self, camera_id: str) -> ConfigWatcher:
+        db = await get_database()
+        camera = await db["cameras"].find_one({"_id": ObjectId(camera_id)}, {"pipeline": 1})
+        return ConfigWatcher(camera_id, self.get_config(camera or {}))
+
+    async def update(self, camera_id: str, changes: dict) -> Optional[CameraPipelineConfig]:
+        """
+        Merge changes (validated by CameraPipelineUpdate) into the camera's
+        config and store it (None if there is no such camera).
+        """
+        db = await get_database()
+        camera = await db["cameras"].find_one({"_id": ObjectId(camera_id)}, {"pipeline": 1})
+        if camera is None:
+            return None
+        config = CameraPipelineConfig(**{**self.get_config(camera).model_dump(), **changes})
+        await db["cameras"].update_one({"_id": ObjectId(camera_id)}, {"$set": {"pipeline": config.model_dump()}})
+        return config
+
+
+# Global instance
+camera_config_service = CameraConfigService()
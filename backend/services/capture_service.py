@@ -0,0 +1,452 @@
+import cv2
+import numpy as np
+import asyncio
+import threading
+import time
+import logging
+import os
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_live_source(url: str) -> bool:
+    """Network streams are live; anything else is treated as a (looping) video file"""
+    return url.startswith(("http://", "https://", "rtsp://"))
+
+
+class CapturedFrame:
+    """A decoded frame plus where and when it was read"""
+    __slots__ = ("image", "index", "captured_at")
+
+    def __init__(self, image: np.ndarray, index: int, captured_at: float):
+        self.image = image
+        self.index = index              # Frame index within the current pass over the source
+        self.captured_at = captured_at  # time.monotonic() when the reader thread decoded it
+
+
+class FrameQueue:
+    """
+    Bounded handoff from a reader thread to an asyncio consumer.
+
+    With drop_oldest the producer never blocks: a full queue discards its
+    oldest frame (live sources should stay at the head of the stream).
+    Without it the producer waits for space, so no frame is ever skipped.
+    """
+
+    def __init__(self, maxsize: int, drop_oldest: bool):
+        self.maxsize = max(1, maxsize)
+        self.drop_oldest = drop_oldest
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._loop = asyncio.get_running_loop()
+        self._waiter: Optional[asyncio.Future] = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item) -> bool:
+        """Called from the reader thread. Returns False once the queue is closed."""
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._closed:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait(0.5)
+            if self._closed:
+                return False
+            self._items.append(item)
+        self._notify()
+        return True
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self):
+        """Wait for the next item. Returns None once the queue is closed and drained."""
+        while True:
+            with self._cond:
+                if self._items:
+                    item = self._items.popleft()
+                    self._cond.notify()
+                    return item
+                if self._closed:
+                    return None
+                self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._notify()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+
+def source_key(source: str) -> str:
+    """Identify a source so every consumer of the same file or stream shares one hub"""
+    if is_live_source(source):
+        return source
+    return os.path.normcase(os.path.realpath(source))
+
+
+class FrameSubscription:
+    """One consumer's view of a FrameHub: its own bounded queue of shared, read-only frames"""
+
+    def __init__(self, hub: "FrameHub", queue: FrameQueue, lossless: bool):
+        self.hub = hub
+        self.queue = queue
+        self.lossless = lossless
+
+    async def get(self) -> Optional[CapturedFrame]:
+        """Next frame, or None once the source has failed or this subscription was closed"""
+        return await self.queue.get()
+
+    def close(self):
+        capture_service.unsubscribe(self)
+
+
+class FrameHub:
+    """
+    Decode-once fan-out for one video source.
+
+    A single long-lived thread owns the cv2.VideoCapture and pushes each
+    decoded frame to every subscriber's FrameQueue (detection loops, MJPEG
+    viewers, ...), so decode CPU is per source rather than per consumer.
+    Frames are shared between subscribers and must be treated as read-only.
+
+    - Lossless subscribers (detection on a file) block the thread when their
+      queue is full, so they see every frame and act as the clock.
+    - Lossy subscribers drop their oldest queued frame instead.
+    - Without a lossless subscriber, file sources pace themselves at the
+      file's fps; live sources run at the stream's own rate.
+    - Live sources grab() without decoding while every subscriber is still
+      holding a frame, then retrieve the newest one, to stay at the head of
+      the stream.
+
+    File sources restart from the beginning when they end; live sources are
+    reopened on read failures and all subscribers are closed after
+    max_failures in a row.
+    """
+
+    def __init__(self, source: str, max_failures: int = 10, metadata: Optional[dict] = None):
+        self.source = source
+        self.metadata = metadata  # Probed at upload; skips re-reading fps and resolution
+        self.key = source_key(source)
+        self.is_live = is_live_source(source)
+        self.max_failures = max_failures
+        self.fps = 30.0
+        self.width = 0
+        self.height = 0
+        self._cap = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._subscribers: List[FrameSubscription] = []
+        self._opened: Optional[asyncio.Future] = None
+        self.closed = False
+        self.frames_read = 0
+        self.frames_skipped = 0
+
+    def _open_capture(self) -> bool:
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self._cap = cap
+        if self.metadata and self.metadata.get("fps"):
+            self.fps = self.metadata["fps"]
+            self.width = self.metadata.get("width", 0)
+            self.height = self.metadata.get("height", 0)
+        else:
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return True
+
+    async def open(self) -> bool:
+        """Open the source (off the event loop) and start the decode thread; concurrent callers share the result"""
+        if self._opened is None:
+            loop = asyncio.get_running_loop()
+            self._opened = loop.create_future()
+            try:
+                opened = await loop.run_in_executor(None, self._open_capture)
+            except Exception as e:
+                logger.error(f"Error opening {self.source}: {e}")
+                opened = False
+            if opened:
+                self._thread = threading.Thread(target=self._run, name=f"capture-{self.source[-32:]}", daemon=True)
+                self._thread.start()
+            else:
+                self.closed = True
+            self._opened.set_result(opened)
+        return await asyncio.shield(self._opened)
+
+    def add_subscriber(self, queue_size: int, lossless: bool) -> FrameSubscription:
+        # Live sources never block on a consumer
+        lossless = lossless and not self.is_live
+        queue = FrameQueue(1 if self.is_live else queue_size, drop_oldest=not lossless)
+        subscription = FrameSubscription(self, queue, lossless)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def remove_subscriber(self, subscription: FrameSubscription) -> int:
+        """Detach a subscriber and return how many remain"""
+        subscription.queue.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+            return len(self._subscribers)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _reopen(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = cv2.VideoCapture(self.source)
+
+    def _run(self):
+        failures = 0
+        index = 0
+        grabbed = False
+        # Self-pacing clock for file sources that have no lossless subscriber
+        clock_start = time.monotonic()
+        clock_frames = 0
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    subscribers = list(self._subscribers)
+
+                if self.is_live and subscribers and all(
+                        sub.queue.qsize() >= sub.queue.maxsize for sub in subscribers):
+                    # Every consumer is still behind: advance the stream without decoding to BGR
+                    grabbed = self._cap.grab()
+                    if grabbed:
+                        self.frames_skipped += 1
+                        continue
+                    ret, frame = False, None
+                elif grabbed:
+                    # Hand over the newest grabbed frame instead of reading one more
+                    ret, frame = self._cap.retrieve()
+                    grabbed = False
+                else:
+                    ret, frame = self._cap.read()
+
+                if not ret or frame is None:
+                    if not self.is_live and index > 0:
+                        logger.info(f"Video file ended, restarting: {self.source}")
+                        self._reopen()
+                        index = 0
+                        continue
+
+                    failures += 1
+                    logger.warning(f"Failed to read frame from {self.source} ({failures}/{self.max_failures})")
+                    if failures >= self.max_failures:
+                        logger.error(f"Max failures reached for {self.source}, stopping reader")
+                        break
+                    self._stop.wait(1)
+                    self._reopen()
+                    continue
+
+                failures = 0
+                self.frames_read += 1
+
+                if not self.is_live and not any(sub.lossless for sub in subscribers):
+                    delay = clock_start + clock_frames / self.fps - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    elif delay < -1.0:
+                        clock_start = time.monotonic() - clock_frames / self.fps
+                    clock_frames += 1
+
+                captured = CapturedFrame(frame, index, time.monotonic())
+                for sub in subscribers:
+                    sub.queue.put(captured)
+                index += 1
+        except Exception as e:
+            logger.error(f"Capture thread error for {self.source}: {e}")
+        finally:
+            if self._cap is not None:
+                self._cap.release()
+            self.closed = True
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for sub in subscribers:
+                sub.queue.close()
+
+    def stop(self):
+        self._stop.set()
+        self.closed = True
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.queue.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "source": self.source,
+            "live": self.is_live,
+            "fps": self.fps,
+            "resolution": [self.width, self.height],
+            "subscribers": self.subscriber_count,
+            "frames_read": self.frames_read,
+            "frames_skipped": self.frames_skipped,
+        }
+
+
+class FramePacer:
+    """
+    Real-time pacing clock for one camera loop.
+
+    - live: frames arrive at the source's own rate, so nothing is slept;
+      lag is how old the frame is when the loop picks it up.
+    - file, realtime: each frame has a deadline start + n / fps on a wall
+      clock; the loop sleeps only until the deadline, so decode and
+      processing time are absorbed instead of added on top. If the loop
+      falls more than max_drift behind, the clock is re-anchored instead
+      of bursting to catch up.
+    - file, fast: no sleeping at all (offline replay as fast as possible).
+    """
+
+    def __init__(self, fps: float, is_live: bool, as_fast_as_possible: bool = False, max_drift: float = 1.0):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.is_live = is_live
+        self.as_fast_as_possible = as_fast_as_possible
+        self.max_drift = max_drift
+        self._start: Optional[float] = None
+        self._paced = 0
+        self.frames = 0
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_total_ms = 0.0
+
+    @property
+    def mode(self) -> str:
+        if self.is_live:
+            return "live"
+        return "fast" if self.as_fast_as_possible else "realtime"
+
+    async def pace(self, captured: CapturedFrame):
+        """Wait until this frame is due and record the current lag"""
+        now = time.monotonic()
+        self.frames += 1
+
+        if self.is_live:
+            self.lag_ms = (now - captured.captured_at) * 1000
+        elif self.as_fast_as_possible:
+            self.lag_ms = 0.0
+            # Still yield so other cameras and API requests get the loop
+            await asyncio.sleep(0)
+        else:
+            if self._start is None:
+                self._start = now
+            deadline = self._start + self._paced / self.fps
+            self._paced += 1
+            delay = deadline - now
+            if delay > 0:
+                self.lag_ms = 0.0
+                await asyncio.sleep(delay)
+            else:
+                self.lag_ms = -delay * 1000
+                if -delay > self.max_drift:
+                    # Re-anchor rather than racing through a backlog
+                    self._start = now - (self._paced - 1) / self.fps
+                await asyncio.sleep(0)
+
+        self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+        self._lag_total_ms += self.lag_ms
+
+    def get_stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "fps": self.fps,
+            "frames": self.frames,
+            "lag_ms": round(self.lag_ms, 1),
+            "avg_lag_ms": round(self._lag_total_ms / self.frames, 1) if self.frames else 0.0,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+        }
+
+
+class CaptureService:
+    """
+    Reference-counted registry of FrameHubs (one per source) plus the
+    per-camera pacers, for metrics. A hub starts with its first subscriber
+    and is shut down as soon as its last subscriber leaves.
+    """
+
+    def __init__(self):
+        self.hubs: Dict[str, FrameHub] = {}
+        self.subscriptions: Dict[str, FrameSubscription] = {}
+        self.pacers: Dict[str, FramePacer] = {}
+
+    async def subscribe(self, source: str, lossless: bool = False, queue_size: int = 4,
+                        metadata: Optional[dict] = None) -> Optional[FrameSubscription]:
+        """
+        Attach to the hub for source, starting it if needed. Returns None if the source cannot be opened.
+        metadata (fps/width/height probed at upload) spares a new hub from re-probing the source.
+        """
+        key = source_key(source)
+        hub = self.hubs.get(key)
+        if hub is None or hub.closed:
+            hub = FrameHub(source, metadata=metadata)
+            self.hubs[key] = hub
+        # Subscribe before awaiting open so a concurrent unsubscribe cannot stop the hub under us
+        subscription = hub.add_subscriber(queue_size, lossless)
+        if not await hub.open():
+            self.unsubscribe(subscription)
+            return None
+        return subscription
+
+    def unsubscribe(self, subscription: FrameSubscription):
+        hub = subscription.hub
+        if hub.remove_subscriber(subscription) == 0:
+            hub.stop()
+            if self.hubs.get(hub.key) is hub:
+                del self.hubs[hub.key]
+            logger.info(f"Capture hub idle, stopped: {hub.source}")
+
+    def register(self, camera_id: str, subscription: FrameSubscription, pacer: FramePacer):
+        self.subscriptions[camera_id] = subscription
+        self.pacers[camera_id] = pacer
+
+    def unregister(self, camera_id: str):
+        self.subscriptions.pop(camera_id, None)
+        self.pacers.pop(camera_id, None)
+
+    def get_stats(self) -> dict:
+        cameras = {}
+        for camera_id, pacer in self.pacers.items():
+            subscription = self.subscriptions.get(camera_id)
+            camera_stats = pacer.get_stats()
+            if subscription is not None:
+                camera_stats.update({
+                    "source": subscription.hub.key,
+                    "frames_dropped": subscription.queue.dropped,
+                    "queued": subscription.queue.qsize(),
+                })
+            cameras[camera_id] = camera_stats
+        return {
+            "cameras": cameras,
+            "hubs": {key: hub.get_stats() for key, hub in self.hubs.items()},
+        }
+
+
+# Global instance
+capture_service = CaptureService()
@@ -0,0 +1,237 @@
+import math
+import time
+import random
+import socket
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from pymongo.errors import DuplicateKeyError
+
+from ..config import settings
+from ..database import get_database
+from ..models import get_pkt_now
+
+logger = logging.getLogger(__name__)
+
+# Like detector_ipc, this module must not import the ML stack: API-role processes route with it.
+
+Address = Tuple[str, int]
+
+
+class DetectorCoordinator:
+    """
+    Shards detection across detector nodes (SHARDING_ENABLED). Every camera
+    with detection_active=True is run by exactly one node: the holder of its
+    lease in detector_leases ({_id: camera id, node_id, address, expires_at}).
+
+    Each node heartbeats its detector_nodes document and renews its leases
+    every LEASE_HEARTBEAT_SECONDS. A lease not renewed for LEASE_TTL_SECONDS
+    (the node crashed or hung) can be claimed by any node. Nodes claim
+    unowned cameras up to their fair share, ceil(cameras / live nodes), and
+    hand back the surplus, so cameras rebalance as nodes join and leave.
+    Claims are a conditional upsert on the camera id, so two nodes can
+    never both win the same camera.
+    """
+
+    def __init__(self):
+        self.node_id = settings.DETECTOR_NODE_ID or f"{socket.gethostname()}:{settings.DETECTOR_IPC_PORT}"
+        # Recorded in leases and node documents: how API processes and other nodes reach this node
+        self.address: Address = (settings.DETECTOR_ADVERTISED_HOST or settings.DETECTOR_IPC_HOST,
+                                 settings.DETECTOR_IPC_PORT)
+        self.owned: Set[str] = set()
+        self._claimed_at: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._start_camera: Optional[Callable[[str], Awaitable]] = None
+        self._stop_camera: Optional[Callable[[str], Awaitable]] = None
+        self._is_running: Optional[Callable[[str], bool]] = None
+        self._is_ready: Optional[Callable[[], bool]] = None
+        self.claims = 0
+        self.releases = 0
+        self.lost = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SHARDING_ENABLED
+
+    def _expiry(self):
+        return get_pkt_now() + timedelta(seconds=settings.LEASE_TTL_SECONDS)
+
+    def start(self, start_camera: Callable[[str], Awaitable], stop_camera: Callable[[str], Awaitable],
+              is_running: Callable[[str], bool], is_ready: Callable[[], bool]):
+        """Join the cluster: start_camera/stop_camera run or halt a camera's loop on this node"""
+        self._start_camera = start_camera
+        self._stop_camera = stop_camera
+        self._is_running = is_running
+        self._is_ready = is_ready
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Detector node {self.node_id} joining the cluster")
+
+    async def _run(self):
+        # Register and wait one heartbeat so nodes starting together see each other before taking a share
+        await self._heartbeat()
+        await asyncio.sleep(settings.LEASE_HEARTBEAT_SECONDS)
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Coordination tick failed on {self.node_id}: {e}")
+            await asyncio.sleep(settings.LEASE_HEARTBEAT_SECONDS)
+
+    async def _heartbeat(self):
+        db = await get_database()
+        now = get_pkt_now()
+        await db["detector_nodes"].update_one(
+            {"_id": self.node_id},
+            {"$set": {"address": list(self.address), "cameras": len(self.owned),
+                      "heartbeat_at": now, "expires_at": self._expiry()}},
+            upsert=True
+        )
+
+    async def claim(self, camera_id: str) -> bool:
+        """Take (or renew) the camera's lease; False while another node holds a live one"""
+        db = await get_database()
+        now = get_pkt_now()
+        try:
+            await db["detector_leases"].update_one(
+                {"_id": camera_id, "$or": [{"node_id": self.node_id}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"node_id": self.node_id, "address": list(self.address),
+                          "claimed_at": now, "expires_at": self._expiry()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The filter did not match an existing lease: it is live and held elsewhere
+            return False
+        if camera_id not in self.owned:
+            self.owned.add(camera_id)
+            self._claimed_at[camera_id] = time.monotonic()
+            self.claims += 1
+        return True
+
+    async def release(self, camera_id: str):
+        """Give up the camera's lease (the caller stops its loop)"""
+        db = await get_database()
+        await db["detector_leases"].delete_one({"_id": camera_id, "node_id": self.node_id})
+        self._claimed_at.pop(camera_id, None)
+        if camera_id in self.owned:
+            self.owned.discard(camera_id)
+            self.releases += 1
+
+    async def _hand_back(self, camera_id: str, reason: str):
+        logger.info(f"Node {self.node_id} releasing camera {camera_id}: {reason}")
+        try:
+            await self._stop_camera(camera_id)
+        finally:
+            await self.release(camera_id)
+
+    async def _tick(self):
+        db = await get_database()
+        await self._heartbeat()
+
+        if self.owned:
+            await db["detector_leases"].update_many(
+                {"_id": {"$in": list(self.owned)}, "node_id": self.node_id},
+                {"$set": {"expires_at": self._expiry()}}
+            )
+            held = {doc["_id"] for doc in await db["detector_leases"].find(
+                {"node_id": self.node_id}, {"_id": 1}).to_list(None)}
+            for camera_id in self.owned - held:
+                # Our lease expired (e.g. a long stall) and another node took the camera over
+                self.lost += 1
+                self.owned.discard(camera_id)
+                self._claimed_at.pop(camera_id, None)
+                logger.warning(f"Node {self.node_id} lost the lease of camera {camera_id}")
+                await self._stop_camera(camera_id)
+
+        desired = {str(doc["_id"]) for doc in await db["cameras"].find(
+            {"detection_active": True}, {"_id": 1}).to_list(None)}
+        for camera_id in sorted(self.owned):
+            if time.monotonic() - self._claimed_at.get(camera_id, 0.0) < settings.LEASE_HEARTBEAT_SECONDS:
+                continue  # Claimed by a start request that may not have started the loop yet
+            if camera_id not in desired:
+                await self._hand_back(camera_id, "detection stopped")
+            elif not self._is_running(camera_id):
+                await self._hand_back(camera_id, "detection loop ended")
+
+        now = get_pkt_now()
+        nodes = await db["detector_nodes"].count_documents({"expires_at": {"$gt": now}})
+        share = math.ceil(len(desired) / max(1, nodes))
+        for camera_id in sorted(self.owned)[:max(0, len(self.owned) - share)]:
+            await self._hand_back(camera_id, f"over fair share of {share}")
+
+        if len(self.owned) >= share or not self._is_ready():
+            return
+        live = {doc["_id"] for doc in await db["detector_leases"].find(
+            {"expires_at": {"$gt": now}}, {"_id": 1}).to_list(None)}
+        orphans = list(desired - live - self.owned)
+        # Nodes claiming at the same moment mostly try different cameras
+        random.shuffle(orphans)
+        for camera_id in orphans:
+            if len(self.owned) >= share:
+                break
+            if not await self.claim(camera_id):
+                continue
+            try:
+                await self._start_camera(camera_id)
+            except Exception as e:
+                logger.warning(f"Node {self.node_id} could not start camera {camera_id}: {e}")
+                await self.release(camera_id)
+
+    async def route(self, camera_id: str) -> Optional[Address]:
+        """IPC address of the node holding the camera's live lease; None if that is this node or nobody"""
+        db = await get_database()
+        lease = await db["detector_leases"].find_one({"_id": camera_id, "expires_at": {"$gt": get_pkt_now()}})
+        if lease is None or lease["node_id"] == self.node_id:
+            return None
+        return tuple(lease["address"])
+
+    async def live_nodes(self) -> List[dict]:
+        """Live node documents, least loaded first"""
+        db = await get_database()
+        return await db["detector_nodes"].find(
+            {"expires_at": {"$gt": get_pkt_now()}}).sort("cameras", 1).to_list(None)
+
+    async def get_cluster_state(self) -> dict:
+        db = await get_database()
+        now = get_pkt_now()
+        nodes = await db["detector_nodes"].find().to_list(None)
+        alive = {node["_id"] for node in await self.live_nodes()}
+        leases = await db["detector_leases"].find({"expires_at": {"$gt": now}}).to_list(None)
+        desired = [str(doc["_id"]) for doc in await db["cameras"].find(
+            {"detection_active": True}, {"_id": 1}).to_list(None)]
+        owners = {lease["_id"]: lease["node_id"] for lease in leases}
+        return {
+            "nodes": [
+                {"node_id": node["_id"], "address": node["address"], "cameras": node.get("cameras", 0),
+                 "alive": node["_id"] in alive}
+                for node in nodes
+            ],
+            "leases": owners,
+            "unassigned": [camera_id for camera_id in desired if camera_id not in owners],
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "cameras": sorted(self.owned),
+            "claims": self.claims,
+            "releases": self.releases,
+            "lost": self.lost,
+        }
+
+    async def shutdown(self):
+        """Leave the cluster and free this node's leases so the others take over right away"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        db = await get_database()
+        await db["detector_leases"].delete_many({"node_id": self.node_id})
+        await db["detector_nodes"].delete_one({"_id": self.node_id})
+        self.owned.clear()
+        self._claimed_at.clear()
+
+
+# Global instance
+coordinator = DetectorCoordinator()
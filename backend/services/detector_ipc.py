@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from ..config import settings
+from .coordination_service import coordinator
+
+logger = logging.getLogger(__name__)
+
+# Nothing in this module may import the ML stack: API-role processes load it.
+
+
+def _authkey() -> bytes:
+    return (settings.DETECTOR_IPC_AUTHKEY or settings.SECRET_KEY).encode()
+
+
+def detector_address() -> Tuple[str, int]:
+    return settings.DETECTOR_IPC_HOST, settings.DETECTOR_IPC_PORT
+
+
+class DetectorServer:
+    """
+    Local IPC endpoint of a detector process. API-role processes send
+    (operation, kwargs) requests; each is run on the detector's event loop
+    by the matching handler and answered with {"status", "result"|"detail"}.
+    """
+
+    def __init__(self):
+        self._listener: Optional[Listener] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handlers: Dict[str, Callable[..., Awaitable]] = {}
+
+    def start(self, handlers: Dict[str, Callable[..., Awaitable]], address: Optional[Tuple[str, int]] = None):
+        self._loop = asyncio.get_running_loop()
+        self._handlers = handlers
+        self._listener = Listener(address or detector_address(), authkey=_authkey())
+        threading.Thread(target=self._accept_loop, name="detector-ipc", daemon=True).start()
+        logger.info(f"Detector IPC listening on {self._listener.address}")
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break  # Listener closed
+            except Exception as e:
+                # Bad authkey or a client that hung up mid-handshake
+                logger.warning(f"Rejected detector IPC connection: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            operation, kwargs = conn.recv()
+            future = asyncio.run_coroutine_threadsafe(self._dispatch(operation, kwargs), self._loop)
+            conn.send(future.result())
+        except Exception as e:
+            logger.error(f"Detector IPC request failed: {e}")
+        finally:
+            conn.close()
+
+    async def _dispatch(self, operation: str, kwargs: dict) -> dict:
+        handler = self._handlers.get(operation)
+        if handler is None:
+            return {"status": 404, "detail": f"Unknown detector operation '{operation}'"}
+        try:
+            return {"status": 200, "result": await handler(**kwargs)}
+        except HTTPException as e:
+            return {"status": e.status_code, "detail": e.detail}
+        except Exception as e:
+            logger.error(f"Detector operation {operation} failed: {e}")
+            return {"status": 500, "detail": str(e)}
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+
+class DetectorClient:
+    """Sends detection requests from an API-role process to a detector process"""
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def _request(self, address: Tuple[str, int], operation: str, kwargs: dict) -> dict:
+        conn = Client(address, authkey=_authkey())
+        try:
+            conn.send((operation, kwargs))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"No reply to '{operation}' within {self.timeout:.0f}s")
+            return conn.recv()
+        finally:
+            conn.close()
+
+    async def request(self, operation: str, address: Optional[Tuple[str, int]] = None, **kwargs) -> Any:
+        """
+        Run a detector operation and return its result. Errors raised by the
+        detector come back as the same HTTPException; an unreachable detector
+        is a 503.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            reply = await loop.run_in_executor(None, self._request, address or detector_address(), operation, kwargs)
+        except (OSError, EOFError, TimeoutError) as e:
+            logger.error(f"Detector unreachable for '{operation}': {e}")
+            raise HTTPException(status_code=503, detail="Detector service unavailable")
+        if reply["status"] != 200:
+            raise HTTPException(status_code=reply["status"], detail=reply["detail"])
+        return reply["result"]
+
+
+# Global instances
+detector_server = DetectorServer()
+detector_client = DetectorClient()
+
+
+async def detector_for(camera_id: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    """
+    IPC address an API-role process should send a request to: with sharding,
+    the node owning camera_id or else the least loaded live node; without,
+    None (the single detector at DETECTOR_IPC_HOST:PORT).
+    """
+    if not coordinator.enabled:
+        return None
+    address = await coordinator.route(camera_id) if camera_id else None
+    if address is None:
+        nodes = await coordinator.live_nodes()
+        if not nodes:
+            raise HTTPException(status_code=503, detail="No detector nodes alive")
+        address = tuple(nodes[0]["address"])
+    return address
+
+
+# Role-aware entry points for code that runs in every role (e.g. the streams routes)
+
+async def schedule_analysis(stream_id: str) -> bool:
+    """Queue the offline analysis of a stream; False if it is already running"""
+    if settings.PROCESS_ROLE == "api":
+        return await detector_client.request("analyze", await detector_for(), stream_id=stream_id)
+    from .analysis_service import analysis_service
+    return await analysis_service.schedule(stream_id)
+
+
+async def timeline_is_current(stream_id: str) -> bool:
+    """Whether the stream's stored timeline matches its pipeline file and the loaded weights"""
+    if settings.PROCESS_ROLE == "api":
+        return await detector_client.request("timeline_current", await detector_for(), stream_id=stream_id)
+    from .analysis_service import analysis_service
+    return await analysis_service.timeline_is_current(stream_id)
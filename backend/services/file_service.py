@@ -0,0 +1,39 @@
+import os
+import mimetypes
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def serve_file(request: Request, path: Path, media_type: Optional[str] = None,
+               cache_control: str = "private, max-age=3600") -> Response:
+    """
+    Serve a stored file with ETag / If-None-Match, Range / If-Range and
+    Cache-Control support, so browsers can play and seek videos natively.
+    Both full and ranged responses (<video> asks for "bytes=0-") go through
+    FileResponse, which answers Range itself: 206 / 416, and If-Range only
+    with a strong match of our ETag or Last-Modified (weak validators fall
+    back to the full file).
+    """
+    stat = os.stat(path)
+    etag = _etag(stat)
+    media_type = media_type or mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse fills in Content-Length / Content-Range for the requested bytes
+    return FileResponse(str(path), media_type=media_type, headers=headers, stat_result=stat)
@@ -0,0 +1,259 @@
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import tensorflow as tf
+
+logger = logging.getLogger(__name__)
+
+# The three graphs every backend runs; all take uint8 frames and cast in-graph
+GRAPHS = ("sequence", "backbone", "head")
+
+# Precision of the exported TFLite graphs (post-training quantization)
+VARIANTS = ("float32", "float16", "int8")
+
+EXPORT_DIR = Path(__file__).resolve().parent.parent / "aiModel" / "export"
+
+# Per export directory: weights hash each variant was exported from
+MANIFEST = "manifest.json"
+
+
+def inference_graphs(service) -> Dict[str, tf.types.experimental.GenericFunction]:
+    """
+    Inference-only tf.functions over the loaded model, with fixed input
+    signatures for export. The TimeDistributed(data_augmentation) layer is
+    dropped (it is the identity at inference), so "sequence" is
+    backbone-per-frame followed by the LSTM/Dense head.
+    """
+    backbone, head = service.backbone, service.head
+    steps, height, width, features = (service.sequence_length, service.image_height,
+                                      service.image_width, service.feature_dim)
+
+    @tf.function(input_signature=[tf.TensorSpec((None, steps, height, width, 3), tf.uint8, name="frames")])
+    def sequence(frames):
+        x = tf.reshape(tf.cast(frames, tf.float32), (-1, height, width, 3))
+        embedded = tf.reshape(backbone(x, training=False), (-1, steps, features))
+        return head(embedded, training=False)
+
+    @tf.function(input_signature=[tf.TensorSpec((None, height, width, 3), tf.uint8, name="frames")])
+    def frames(frames):
+        return backbone(tf.cast(frames, tf.float32), training=False)
+
+    @tf.function(input_signature=[tf.TensorSpec((None, steps, features), tf.float32, name="features")])
+    def sequence_head(embedded):
+        return head(embedded, training=False)
+
+    return {"sequence": sequence, "backbone": frames, "head": sequence_head}
+
+
+def read_manifest(model_dir: Path) -> Dict[str, str]:
+    path = model_dir / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def record_export(model_dir: Path, variant: str, weights_version: Optional[str]):
+    """Record (or, with None, forget) the weights a variant's graphs in model_dir were exported from"""
+    manifest = read_manifest(model_dir)
+    if weights_version is None:
+        manifest.pop(variant, None)
+    else:
+        manifest[variant] = weights_version
+    (model_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+
+def export_onnx(service, out_dir: Path, opset: int = 17) -> Dict[str, Path]:
+    """Convert the inference graphs to ONNX files in out_dir (needs tf2onnx)"""
+    try:
+        import tf2onnx
+    except ImportError:
+        raise RuntimeError("ONNX export needs tf2onnx (pip install tf2onnx)")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, fn in inference_graphs(service).items():
+        path = out_dir / f"{name}.onnx"
+        tf2onnx.convert.from_function(fn, input_signature=fn.input_signature, opset=opset, output_path=str(path))
+        paths[name] = path
+        logger.info(f"Exported {name} graph to {path}")
+    record_export(out_dir, "float32", service.weights_version)
+    return paths
+
+
+def variant_suffix(variant: str) -> str:
+    """File name suffix of a quantized variant ("" for float32)"""
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}', expected one of {VARIANTS}")
+    return "" if variant == "float32" else f".{variant}"
+
+
+def export_tflite(service, out_dir: Path, variant: str = "float32",
+                  calibration: Optional[Dict[str, Callable]] = None) -> Dict[str, Path]:
+    """
+    Convert the inference graphs to TFLite flatbuffers in out_dir.
+    float16 stores weights as float16; int8 quantizes weights and
+    activations post-training, calibrated by calibration[graph] (a
+    representative-dataset generator per graph). Ops without an int8
+    kernel stay in float.
+    """
+    suffix = variant_suffix(variant)
+    if variant == "int8" and not calibration:
+        raise ValueError("int8 quantization needs calibration data")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, fn in inference_graphs(service).items():
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([fn.get_concrete_function()], service.model)
+        # The LSTM may need TF ops that have no builtin TFLite kernel
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        if variant == "float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == "int8":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = calibration[name]
+        path = out_dir / f"{name}{suffix}.tflite"
+        path.write_bytes(converter.convert())
+        paths[name] = path
+        logger.info(f"Exported {name} graph to {path}")
+    record_export(out_dir, variant, service.weights_version)
+    return paths
+
+
+class InferenceBackend:
+    """
+    Runs the accident model's graphs and returns raw outputs:
+    predict_sequences -> (N, 2) softmax, embed_frames -> (N, feature_dim),
+    predict_features -> (N, 2) softmax. Inputs are uint8 frames (float32
+    features for the head), already batched.
+    """
+    name = "base"
+
+    def predict_sequences(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_frames(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict_features(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class KerasBackend(InferenceBackend):
+    """The loaded tf.keras model (or its cached SavedModel graphs) through compiled tf.functions"""
+    name = "keras"
+
+    def __init__(self, service):
+        self.service = service
+
+    def predict_sequences(self, batch: np.ndarray) -> np.ndarray:
+        return self.service._forward_sequences(batch).numpy()
+
+    def embed_frames(self, batch: np.ndarray) -> np.ndarray:
+        return self.service._forward_frames(batch).numpy()
+
+    def predict_features(self, batch: np.ndarray) -> np.ndarray:
+        return self.service._forward_head(batch).numpy()
+
+
+class OnnxBackend(InferenceBackend):
+    """Exported graphs on ONNX Runtime (CPU); much lower per-call overhead than Keras"""
+    name = "onnx"
+
+    def __init__(self, model_dir: Path):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("INFERENCE_BACKEND=onnx needs onnxruntime (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._sessions = {}
+        for name in GRAPHS:
+            path = model_dir / f"{name}.onnx"
+            if not path.exists():
+                raise FileNotFoundError(f"{path} not found; run export_model.py --format onnx")
+            self._sessions[name] = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    def _run(self, name: str, batch: np.ndarray) -> np.ndarray:
+        session = self._sessions[name]
+        return session.run(None, {session.get_inputs()[0].name: batch})[0]
+
+    def predict_sequences(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("sequence", batch)
+
+    def embed_frames(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("backbone", batch)
+
+    def predict_features(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("head", np.ascontiguousarray(batch, dtype=np.float32))
+
+
+class TFLiteBackend(InferenceBackend):
+    """Exported graphs on the TFLite interpreter (XNNPACK on CPU)"""
+    name = "tflite"
+
+    def __init__(self, model_dir: Path, variant: str = "float32"):
+        self.variant = variant
+        suffix = variant_suffix(variant)
+        self._interpreters = {}
+        for name in GRAPHS:
+            path = model_dir / f"{name}{suffix}.tflite"
+            if not path.exists():
+                raise FileNotFoundError(f"{path} not found; run export_model.py --format tflite --variant {variant}")
+            interpreter = tf.lite.Interpreter(model_path=str(path))
+            interpreter.allocate_tensors()
+            self._interpreters[name] = interpreter
+
+    def _run(self, name: str, batch: np.ndarray) -> np.ndarray:
+        interpreter = self._interpreters[name]
+        input_detail = interpreter.get_input_details()[0]
+        if tuple(input_detail["shape"]) != batch.shape:
+            # Batch size changed since the last call
+            interpreter.resize_tensor_input(input_detail["index"], batch.shape)
+            interpreter.allocate_tensors()
+            input_detail = interpreter.get_input_details()[0]
+        interpreter.set_tensor(input_detail["index"], batch.astype(input_detail["dtype"], copy=False))
+        interpreter.invoke()
+        output_detail = interpreter.get_output_details()[0]
+        output = interpreter.get_tensor(output_detail["index"])
+        scale, zero_point = output_detail["quantization"]
+        if scale:
+            # Integer output tensor: back to real values
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def predict_sequences(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("sequence", batch)
+
+    def embed_frames(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("backbone", batch)
+
+    def predict_features(self, batch: np.ndarray) -> np.ndarray:
+        return self._run("head", np.asarray(batch, dtype=np.float32))
+
+
+def check_export(model_dir: Path, variant: str, weights_version: str):
+    """Refuse graphs exported from other weights than the loaded ones"""
+    exported_from = read_manifest(model_dir).get(variant)
+    if exported_from != weights_version:
+        raise ValueError(f"{model_dir} ({variant}) was exported from weights {exported_from or 'unknown'}, "
+                         f"loaded weights are {weights_version}; re-run export_model.py")
+
+
+def create_backend(name: str, service, model_dir: Optional[Path] = None,
+                   variant: str = "float32") -> InferenceBackend:
+    """
+    Backend for INFERENCE_BACKEND; the Keras model must already be loaded.
+    Quantized variants exist only for tflite, and exported graphs must come
+    from the loaded weights.
+    """
+    if name != "tflite" and variant != "float32":
+        raise ValueError(f"Model variant '{variant}' needs INFERENCE_BACKEND=tflite")
+    if name == "keras":
+        return KerasBackend(service)
+    if name not in ("onnx", "tflite"):
+        raise ValueError(f"Unknown inference backend '{name}', expected keras, onnx or tflite")
+    export_dir = (model_dir or EXPORT_DIR) / name
+    check_export(export_dir, variant, service.weights_version)
+    if name == "onnx":
+        return OnnxBackend(export_dir)
+    return TFLiteBackend(export_dir, variant)
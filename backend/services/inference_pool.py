@@ -0,0 +1,213 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# AccidentDetectionService methods a worker may run on a batch
+METHODS = ("predict_batch", "embed_frames", "predict_features_batch", "screen_batch")
+
+
+def _worker_main(worker_id: int, conn, slot_name: str, warmup_batch_sizes: List[int]):
+    """
+    Worker process: loads and warms up the model once, then serves batches
+    written into its shared-memory slot until it receives None.
+    """
+    logging.basicConfig(level=logging.INFO)
+    from .accident_detection_service import accident_detection_service
+
+    slot = SharedMemory(name=slot_name)
+    # The parent owns the segment; keep this process's tracker from unlinking it on exit
+    resource_tracker.unregister(slot._name, "shared_memory")
+    try:
+        accident_detection_service.load_model()
+        accident_detection_service.warmup(warmup_batch_sizes)
+        conn.send(("ready", {"pid": os.getpid(), "has_screener": accident_detection_service.has_screener}))
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            method, shape, dtype = message
+            batch = np.ndarray(shape, dtype=dtype, buffer=slot.buf)
+            try:
+                result = getattr(accident_detection_service, method)(list(batch))
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            del batch
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        slot.close()
+
+
+class _Worker:
+    """One model process with its own shared-memory input slot"""
+
+    def __init__(self, worker_id: int, context, slot_bytes: int, warmup_batch_sizes: List[int]):
+        self.worker_id = worker_id
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.context = context
+        self.slot = SharedMemory(create=True, size=slot_bytes)
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.has_screener = False
+        self.restarts = 0
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def start(self, timeout: float):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(self.worker_id, child_conn, self.slot.name, self.warmup_batch_sizes),
+            name=f"inference-worker-{self.worker_id}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        # Wait for the model to load
+        if not self.conn.poll(timeout):
+            self.process.kill()
+            raise RuntimeError(f"Inference worker {self.worker_id} did not become ready in {timeout:.0f}s")
+        status, info = self.conn.recv()
+        self.pid = info["pid"]
+        self.has_screener = info["has_screener"]
+        self.started_at = time.monotonic()
+        self.busy_seconds = 0.0
+        logger.info(f"Inference worker {self.worker_id} ready (pid {self.pid})")
+
+    def restart(self, timeout: float):
+        self.restarts += 1
+        logger.warning(f"Restarting inference worker {self.worker_id} (restart #{self.restarts})")
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        self.start(timeout)
+
+    def call(self, method: str, payloads: List[np.ndarray]):
+        shape = (len(payloads),) + payloads[0].shape
+        dtype = payloads[0].dtype
+        if int(np.prod(shape)) * dtype.itemsize > self.slot.size:
+            raise ValueError(f"Batch of {shape} {dtype} does not fit the {self.slot.size} byte slot")
+        # Stack straight into shared memory: the worker reads the batch without any pickling
+        view = np.ndarray(shape, dtype=dtype, buffer=self.slot.buf)
+        np.stack(payloads, out=view)
+        del view
+
+        started = time.perf_counter()
+        self.conn.send((method, shape, dtype.str))
+        while not self.conn.poll(1.0):
+            if not self.process.is_alive():
+                raise ConnectionError(f"Inference worker {self.worker_id} died (exit code {self.process.exitcode})")
+        status, result = self.conn.recv()
+        self.busy_seconds += time.perf_counter() - started
+        if status != "ok":
+            raise RuntimeError(result)
+        self.batches += 1
+        self.items += len(payloads)
+        return result
+
+    def stop(self):
+        try:
+            if self.process is not None and self.process.is_alive():
+                self.conn.send(None)
+                self.process.join(timeout=5)
+                if self.process.is_alive():
+                    self.process.kill()
+        except (OSError, ValueError):
+            pass
+        self.slot.close()
+        self.slot.unlink()
+
+    def get_stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at
+        return {
+            "pid": self.pid,
+            "alive": self.process is not None and self.process.is_alive(),
+            "restarts": self.restarts,
+            "batches": self.batches,
+            "items": self.items,
+            "utilization": round(self.busy_seconds / uptime, 3) if uptime > 0 else 0.0,
+        }
+
+
+class InferencePool:
+    """
+    Runs model batches in separate worker processes, each with its own
+    copy of the model, so inference does not share the API process's GIL.
+    Batches travel through one shared-memory slot per worker; only the
+    method name, shape and results go through the pipe. A worker that
+    dies is restarted and the batch it was running fails.
+
+    run() blocks until a worker is free, so call it from as many threads
+    as there are workers.
+    """
+
+    def __init__(self, workers: int, slot_bytes: int, warmup_batch_sizes: List[int],
+                 start_timeout: float = 300.0):
+        self.size = max(1, workers)
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.slot_bytes = slot_bytes
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        """Spawn the workers and wait for their models to load and warm up (blocking, idempotent)"""
+        with self._lock:
+            if self.started:
+                return
+            for worker_id in range(self.size):
+                worker = _Worker(worker_id, self._context, self.slot_bytes, self.warmup_batch_sizes)
+                worker.start(self.start_timeout)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self.started = True
+
+    @property
+    def has_screener(self) -> bool:
+        return bool(self._workers) and all(worker.has_screener for worker in self._workers)
+
+    def run(self, method: str, payloads: List[np.ndarray]):
+        """Run accident_detection_service.<method>(payloads) in the next free worker"""
+        if method not in METHODS:
+            raise ValueError(f"Unsupported inference method '{method}'")
+        self.start()
+        worker = self._idle.get()
+        try:
+            return worker.call(method, payloads)
+        except (ConnectionError, EOFError, BrokenPipeError):
+            worker.restart(self.start_timeout)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            self._idle = queue.Queue()
+            self.started = False
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.size,
+            "started": self.started,
+            "idle": self._idle.qsize(),
+            "slot_bytes": self.slot_bytes,
+            "per_worker": [worker.get_stats() for worker in self._workers],
+        }
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from ..config import settings
+from .accident_detection_service import accident_detection_service
+from .inference_pool import InferencePool
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchQueue:
+    """
+    Collects requests of one kind and runs them through batch_fn together.
+
+    A batch is dispatched as soon as it holds max_batch_size items or
+    max_wait has passed since its first item arrived, whichever is first.
+    Up to concurrency batches run at once (one per inference worker).
+    """
+
+    def __init__(self, name: str, batch_fn: Callable, executor: ThreadPoolExecutor,
+                 max_batch_size: int, max_wait: float, concurrency: int = 1):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._running = set()
+        self.batches_run = 0
+        self.items_run = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+        self.total_batch_ms = 0.0
+
+    def submit(self, camera_id: str, payload) -> asyncio.Future:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((camera_id, payload, future))
+        return future
+
+    async def _collect_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Camera loops that were stopped meanwhile no longer need their result
+        return [item for item in batch if not item[2].done()]
+
+    async def _run(self):
+        while True:
+            # Start collecting the next batch only once a slot is free to run it
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, batch: list):
+        loop = asyncio.get_running_loop()
+        try:
+            payloads = [payload for _, payload, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, payloads)
+            except Exception as e:
+                logger.error(f"Batched {self.name} inference failed for cameras {[cid for cid, _, _ in batch]}: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.batches_run += 1
+            self.items_run += len(batch)
+            self.last_batch_size = len(batch)
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+            self.total_batch_ms += self.last_batch_ms
+
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches_run": self.batches_run,
+            "items_run": self.items_run,
+            "avg_batch_size": self.items_run / self.batches_run if self.batches_run else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_ms": self.last_batch_ms,
+            "avg_batch_ms": self.total_batch_ms / self.batches_run if self.batches_run else 0.0,
+        }
+
+    async def shutdown(self):
+        for task in list(self._running):
+            task.cancel()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+class InferenceScheduler:
+    """
+    Central scheduler that collects ready work from every active camera
+    and runs it through the model as batched forward passes.
+
+    - sequences: full (sequence_length, H, W, 3) windows through the whole model
+    - frames: single preprocessed frames through the CNN backbone only
+    - features: (sequence_length, feature_dim) embedding windows through the LSTM head only
+    - screening: sequences through the small first-stage model of the cascade
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # Either one dedicated thread runs the model in-process (so inference never competes
+        # with frame reads and email sends on the default executor), or worker processes do,
+        # with one thread per worker waiting on it
+        self.pool: Optional[InferencePool] = None
+        # Model lifecycle: not_loaded -> loading -> warming_up -> ready (or failed)
+        self.state = "not_loaded"
+        self.state_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._model_lock = threading.Lock()
+        concurrency = 1
+        if settings.INFERENCE_WORKERS > 0:
+            sequence_bytes = (accident_detection_service.sequence_length * accident_detection_service.image_height *
+                              accident_detection_service.image_width * 3)
+            self.pool = InferencePool(settings.INFERENCE_WORKERS, slot_bytes=self.max_batch_size * sequence_bytes,
+                                      warmup_batch_sizes=self.warmup_batch_sizes)
+            accident_detection_service.pool = self.pool
+            concurrency = self.pool.size
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="inference")
+        self._sequences = _BatchQueue("sequence", self._batch_fn("predict_batch"),
+                                      self._executor, self.max_batch_size, self.max_wait, concurrency)
+        self._frames = _BatchQueue("frame", self._embed_batch,
+                                   self._executor, self.max_batch_size, self.max_wait, concurrency)
+        self._features = _BatchQueue("feature", self._batch_fn("predict_features_batch"),
+                                     self._executor, self.max_batch_size, self.max_wait, concurrency)
+        self._screening = _BatchQueue("screening", self._batch_fn("screen_batch"),
+                                      self._executor, self.max_batch_size, self.max_wait, concurrency)
+        # Cascade metrics, measured per window from submit to result (queueing included)
+        self.windows_screened = 0
+        self.windows_escalated = 0
+        self.screen_ms_total = 0.0
+        self.confirm_ms_total = 0.0
+
+    def _batch_fn(self, method: str) -> Callable:
+        """accident_detection_service.<method>, in a worker process when the pool is enabled"""
+        if self.pool is None:
+            return getattr(accident_detection_service, method)
+        return lambda payloads: self.pool.run(method, payloads)
+
+    def _embed_batch(self, frames: list) -> list:
+        return list(self._batch_fn("embed_frames")(frames))
+
+    @property
+    def warmup_batch_sizes(self) -> list:
+        return sorted({1, self.max_batch_size})
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def ensure_model(self):
+        """
+        Load and warm up the model where inference runs: in this process or
+        in every pool worker (blocking, safe to call from several threads).
+        """
+        with self._model_lock:
+            if self.state == "ready":
+                return
+            started = time.perf_counter()
+            try:
+                self.state = "loading"
+                if self.pool is not None:
+                    # Workers warm themselves up before reporting ready; this process only needs
+                    # the weight hashes its prediction cache keys on
+                    accident_detection_service.load_versions()
+                    self.pool.start()
+                else:
+                    accident_detection_service.load_model()
+                    self.state = "warming_up"
+                    accident_detection_service.warmup(self.warmup_batch_sizes)
+            except Exception as e:
+                self.state = "failed"
+                self.state_error = str(e)
+                raise
+            self.load_seconds = time.perf_counter() - started
+            self.state = "ready"
+            self.state_error = None
+            logger.info(f"Inference ready in {self.load_seconds:.1f}s")
+
+    async def warmup(self):
+        """Background startup task: load and warm up the model off the event loop"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self.ensure_model)
+        except Exception as e:
+            logger.error(f"Model warmup failed: {e}")
+
+    def get_model_status(self) -> dict:
+        return {
+            "state": self.state,
+            "error": self.state_error,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "backend": settings.INFERENCE_BACKEND,
+            "workers": self.pool.size if self.pool is not None else 0,
+            "warmup_batch_sizes": self.warmup_batch_sizes,
+        }
+
+    def submit(self, camera_id: str, sequence: np.ndarray) -> asyncio.Future:
+        """
+        Queue a (sequence_length, H, W, 3) sequence for prediction.
+        Returns a future that resolves to (is_accident, confidence).
+        """
+        return self._sequences.submit(camera_id, sequence)
+
+    @property
+    def cascade_active(self) -> bool:
+        has_screener = self.pool.has_screener if self.pool is not None else accident_detection_service.has_screener
+        return settings.CASCADE_ENABLED and has_screener
+
+    def submit_cascade(self, camera_id: str, sequence: np.ndarray) -> asyncio.Future:
+        """
+        Like submit(), but the sequence is first scored by the screening model
+        and only escalated to the full CNN-LSTM when that score reaches
+        CASCADE_ESCALATE_THRESHOLD. Falls back to submit() without a screener.
+        Windows that are not escalated resolve to (False, screening score).
+        """
+        if not self.cascade_active:
+            return self.submit(camera_id, sequence)
+        return asyncio.ensure_future(self._cascade(camera_id, sequence))
+
+    async def _cascade(self, camera_id: str, sequence: np.ndarray) -> tuple:
+        started = time.perf_counter()
+        score = await self._screening.submit(camera_id, sequence)
+        screened = time.perf_counter()
+        self.windows_screened += 1
+        self.screen_ms_total += (screened - started) * 1000
+        if score < settings.CASCADE_ESCALATE_THRESHOLD:
+            return False, score
+        self.windows_escalated += 1
+        result = await self._sequences.submit(camera_id, sequence)
+        self.confirm_ms_total += (time.perf_counter() - screened) * 1000
+        return result
+
+    def get_cascade_stats(self) -> dict:
+        return {
+            "active": self.cascade_active,
+            "escalate_threshold": settings.CASCADE_ESCALATE_THRESHOLD,
+            "windows_screened": self.windows_screened,
+            "windows_escalated": self.windows_escalated,
+            "escalation_rate": round(self.windows_escalated / self.windows_screened, 3) if self.windows_screened else 0.0,
+            "avg_screen_ms": self.screen_ms_total / self.windows_screened if self.windows_screened else 0.0,
+            "avg_confirm_ms": self.confirm_ms_total / self.windows_escalated if self.windows_escalated else 0.0,
+        }
+
+    def embed(self, camera_id: str, frame: np.ndarray) -> asyncio.Future:
+        """
+        Queue a preprocessed frame for the CNN backbone.
+        Returns a future that resolves to its (feature_dim,) embedding.
+        """
+        return self._frames.submit(camera_id, frame)
+
+    def submit_features(self, camera_id: str, features: np.ndarray) -> asyncio.Future:
+        """
+        Queue a (sequence_length, feature_dim) embedding window for the LSTM head.
+        Returns a future that resolves to (is_accident, confidence).
+        """
+        return self._features.submit(camera_id, features)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "sequences": self._sequences.get_stats(),
+            "frames": self._frames.get_stats(),
+            "features": self._features.get_stats(),
+            "screening": self._screening.get_stats(),
+            "cascade": self.get_cascade_stats(),
+            "pool": self.pool.get_stats() if self.pool is not None else None,
+        }
+
+    async def shutdown(self):
+        for batch_queue in (self._sequences, self._frames, self._features, self._screening):
+            await batch_queue.shutdown()
+        self._executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+# Global instance
+inference_scheduler = InferenceScheduler(
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
@@ -0,0 +1,137 @@
+import cv2
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+import aiofiles
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from fastapi import Request
+from starlette.datastructures import UploadFile as FormFile
+from starlette.formparsers import MultiPartParser
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+FORM_OVERHEAD_BYTES = 64 * 1024  # Multipart boundaries and part headers around the file
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def probe_video(video_path: str) -> Optional[dict]:
+    """Read fps, resolution, frame count, duration and codec from a video file (blocking)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC) or 0)
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ") or None
+        return {
+            "fps": fps,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frame_count": frame_count,
+            "duration_seconds": frame_count / fps if fps > 0 else None,
+            "codec": codec,
+        }
+    finally:
+        cap.release()
+
+
+class IngestService:
+    """
+    Streams an upload to disk in chunks while hashing it, stores it under its
+    content hash (so identical re-uploads share one file) and probes it once.
+    """
+
+    def __init__(self, upload_dir: Path):
+        self.upload_dir = upload_dir
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+
+    async def read_upload(self, request: Request, field: str = "file") -> Optional[FormFile]:
+        """
+        Parse a multipart upload straight from the request stream and return
+        its file field (None if missing), refusing it as soon as it is known
+        to exceed MAX_UPLOAD_MB: up front from Content-Length, otherwise once
+        that many bytes have arrived, so an oversized body is never spooled to
+        disk in full. Raises UploadTooLarge; the caller closes the file.
+        """
+        max_body = settings.MAX_UPLOAD_MB * 1024 * 1024 + FORM_OVERHEAD_BYTES
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_body:
+            raise UploadTooLarge(f"Upload exceeds {settings.MAX_UPLOAD_MB} MB")
+
+        async def limited(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+            received = 0
+            async for chunk in stream:
+                received += len(chunk)
+                if received > max_body:
+                    raise UploadTooLarge(f"Upload exceeds {settings.MAX_UPLOAD_MB} MB")
+                yield chunk
+
+        form = await MultiPartParser(request.headers, limited(request.stream())).parse()
+        file = form.get(field)
+        for _, value in form.multi_items():
+            if value is not file and isinstance(value, FormFile):
+                await value.close()
+        return file if isinstance(file, FormFile) else None
+
+    async def ingest(self, file: FormFile) -> dict:
+        """
+        Returns {"video_path", "content_hash", "size_bytes", "metadata", "deduplicated"}.
+        Raises UploadTooLarge when the upload exceeds MAX_UPLOAD_MB.
+        """
+        max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+        file_ext = Path(file.filename or "").suffix.lower() or ".mp4"
+        temp_path = self.upload_dir / f".ingest-{uuid.uuid4()}{file_ext}"
+        sha256 = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(temp_path, "wb") as out:
+                while True:
+                    chunk = await file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {settings.MAX_UPLOAD_MB} MB")
+                    sha256.update(chunk)
+                    await out.write(chunk)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        content_hash = sha256.hexdigest()
+        final_path = self.upload_dir / f"{content_hash}{file_ext}"
+        deduplicated = final_path.exists()
+        if deduplicated:
+            # Same bytes already stored; keep the existing file
+            temp_path.unlink(missing_ok=True)
+            logger.info(f"Upload deduplicated to existing file {final_path}")
+        else:
+            os.replace(temp_path, final_path)
+
+        loop = asyncio.get_running_loop()
+        metadata = await loop.run_in_executor(None, probe_video, str(final_path))
+        if metadata is None:
+            logger.warning(f"Could not probe uploaded video {final_path}")
+
+        return {
+            "video_path": str(final_path),
+            "content_hash": content_hash,
+            "size_bytes": size,
+            "metadata": metadata,
+            "deduplicated": deduplicated,
+        }
+
+
+# Global instance
+ingest_service = IngestService(Path(__file__).resolve().parent.parent / "uploads")
@@ -0,0 +1,128 @@
+import cv2
+import logging
+import numpy as np
+from typing import Dict, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """
+    Cheap motion score on downscaled grayscale frames (blurred frame
+    differencing) that decides whether a camera's next prediction is worth
+    running. A prediction is allowed when motion since the last one reached
+    the threshold, or when max_skip_frames have passed without one.
+    """
+
+    def __init__(self, threshold: float, max_skip_frames: int, width: int = 160, pixel_delta: int = 25):
+        self.threshold = threshold            # Fraction of changed pixels that counts as motion
+        self.max_skip_frames = max(1, max_skip_frames)
+        self.width = width
+        self.pixel_delta = pixel_delta        # Per-pixel intensity change that counts as changed
+        self._previous: Optional[np.ndarray] = None
+        self.motion = 0.0                     # Score of the latest frame
+        self.peak_motion = 0.0                # Highest score since the last allowed prediction
+        self.frames_since_prediction = 0
+        self.static_frames = 0                # Consecutive frames below the threshold
+        self.predictions_allowed = 0
+        self.predictions_skipped = 0
+        self.embeddings_skipped = 0
+
+    def update(self, frame: np.ndarray) -> float:
+        """Score one frame against the previous one (fraction of pixels that changed)"""
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self._previous is None or self._previous.shape != gray.shape:
+            # Nothing to compare with yet; treat the first frame as motion so it gets scored
+            self.motion = 1.0
+        else:
+            diff = cv2.absdiff(gray, self._previous)
+            self.motion = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        self._previous = gray
+        self.peak_motion = max(self.peak_motion, self.motion)
+        self.frames_since_prediction += 1
+        self.static_frames = self.static_frames + 1 if self.motion < self.threshold else 0
+        return self.motion
+
+    def skip_embedding(self, idle_frames: int) -> bool:
+        """
+        Whether to skip embedding the latest frame: the scene has been static
+        for idle_frames and no forced prediction is due yet. Per frame, so the
+        backbone is gated as well as the prediction.
+        """
+        if self.static_frames >= idle_frames and self.frames_since_prediction < self.max_skip_frames:
+            self.embeddings_skipped += 1
+            return True
+        return False
+
+    def allow_prediction(self) -> bool:
+        """Whether to run the prediction that is due now; counts the decision either way"""
+        if self.peak_motion >= self.threshold or self.frames_since_prediction >= self.max_skip_frames:
+            self.predictions_allowed += 1
+            self.peak_motion = 0.0
+            self.frames_since_prediction = 0
+            return True
+        self.predictions_skipped += 1
+        return False
+
+    def get_stats(self) -> dict:
+        decisions = self.predictions_allowed + self.predictions_skipped
+        return {
+            "threshold": self.threshold,
+            "max_skip_frames": self.max_skip_frames,
+            "motion": round(self.motion, 4),
+            "predictions_allowed": self.predictions_allowed,
+            "predictions_skipped": self.predictions_skipped,
+            "embeddings_skipped": self.embeddings_skipped,
+            "gate_ratio": round(self.predictions_skipped / decisions, 3) if decisions else 0.0,
+        }
+
+
+class MotionService:
+    """Per-camera motion gates in front of the expensive model"""
+
+    def __init__(self):
+        self.gates: Dict[str, MotionGate] = {}
+
+    def create_gate(self, camera_id: str, fps: float, threshold: Optional[float] = None) -> Optional[MotionGate]:
+        """A gate for the camera, or None when gating is disabled"""
+        if not settings.MOTION_GATE_ENABLED:
+            return None
+        gate = MotionGate(
+            threshold=settings.MOTION_GATE_THRESHOLD if threshold is None else threshold,
+            max_skip_frames=int(settings.MOTION_GATE_MAX_SKIP_SECONDS * (fps or 30.0)),
+            width=settings.MOTION_GATE_WIDTH,
+            pixel_delta=settings.MOTION_GATE_PIXEL_DELTA
+        )
+        self.gates[camera_id] = gate
+        return gate
+
+    def configure_gate(self, camera_id: str, fps: float, threshold: Optional[float] = None):
+        """Apply a changed frame rate or threshold to the camera's running gate"""
+        gate = self.gates.get(camera_id)
+        if gate is None:
+            return
+        gate.threshold = settings.MOTION_GATE_THRESHOLD if threshold is None else threshold
+        gate.max_skip_frames = max(1, int(settings.MOTION_GATE_MAX_SKIP_SECONDS * (fps or 30.0)))
+
+    def release_gate(self, camera_id: str):
+        self.gates.pop(camera_id, None)
+
+    def get_stats(self) -> dict:
+        cameras = {camera_id: gate.get_stats() for camera_id, gate in self.gates.items()}
+        allowed = sum(c["predictions_allowed"] for c in cameras.values())
+        skipped = sum(c["predictions_skipped"] for c in cameras.values())
+        return {
+            "enabled": settings.MOTION_GATE_ENABLED,
+            "predictions_allowed": allowed,
+            "predictions_skipped": skipped,
+            "gate_ratio": round(skipped / (allowed + skipped), 3) if allowed + skipped else 0.0,
+            "cameras": cameras,
+        }
+
+
+# Global instance
+motion_service = MotionService()
@@ -0,0 +1,291 @@
+import cv2
+import numpy as np
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedFrame:
+    """A snippet frame held as JPEG bytes (encoded in the background) instead of a raw array"""
+    __slots__ = ("future", "nbytes", "buffered")
+
+    def __init__(self, future: Future):
+        self.future = future
+        self.nbytes = 0           # Set once the encode finishes (0 for a repeated frame)
+        self.buffered = False     # Counted in a SnippetBuffer's byte total
+
+    def decode(self) -> Optional[np.ndarray]:
+        try:
+            data = self.future.result()
+        except Exception as e:
+            logger.error(f"Snippet frame encode failed: {e}")
+            return None
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+class SnippetBuffer:
+    """
+    Rolling pre-trigger buffer of compressed frames for one camera.
+
+    Frames are downscaled to max_width and JPEG-encoded on the shared encoder
+    threads, so a 1080p camera holds a few MB instead of ~900 MB of raw frames.
+    The buffer is bounded both by duration (fps * seconds) and by max_bytes.
+    Frames are decoded only when an alert actually fires.
+
+    Pending encodes and buffered bytes are counted as encodes finish (on the
+    encoder threads, under _lock), so appending a frame is O(1).
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, fps: float, seconds: float,
+                 max_width: int, quality: int, max_bytes: int, max_pending: int):
+        self.executor = executor
+        self.max_width = max_width
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.frames = deque(maxlen=max(1, int(fps * seconds)))
+        self.max_pending = max_pending
+        self.repeated_frames = 0
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._bytes = 0
+        self._last: Optional[EncodedFrame] = None
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            scale = self.max_width / w
+            frame = cv2.resize(frame, (self.max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encode failed")
+        return buffer.tobytes()
+
+    def _encoded(self, entry: EncodedFrame, future: Future):
+        """Done callback of a submitted encode (runs on an encoder thread)"""
+        size = len(future.result()) if not future.cancelled() and future.exception() is None else 0
+        with self._lock:
+            self._pending -= 1
+            entry.nbytes = size
+            if entry.buffered:
+                self._bytes += size
+
+    def encode(self, frame: np.ndarray) -> EncodedFrame:
+        """
+        Compress a frame in the background. When the encoder threads fall
+        behind, the previous frame is repeated instead so the event loop never
+        encodes; the snippet keeps its timing with a brief freeze.
+        """
+        if self._pending >= self.max_pending and self._last is not None:
+            self.repeated_frames += 1
+            return EncodedFrame(self._last.future)
+        with self._lock:
+            self._pending += 1
+        entry = EncodedFrame(self.executor.submit(self._encode, frame))
+        entry.future.add_done_callback(lambda future: self._encoded(entry, future))
+        self._last = entry
+        return entry
+
+    def _popleft(self):
+        entry = self.frames.popleft()
+        with self._lock:
+            entry.buffered = False
+            self._bytes -= entry.nbytes
+
+    def append(self, frame: np.ndarray):
+        entry = self.encode(frame)
+        if len(self.frames) == self.frames.maxlen:
+            self._popleft()
+        with self._lock:
+            entry.buffered = True
+            self._bytes += entry.nbytes
+        self.frames.append(entry)
+        # Enforce the byte budget by dropping the oldest frames
+        while len(self.frames) > 1 and self._bytes > self.max_bytes:
+            self._popleft()
+
+    def set_duration(self, fps: float, seconds: float):
+        """Change how much footage the buffer holds, keeping the newest frames"""
+        maxlen = max(1, int(fps * seconds))
+        while len(self.frames) > maxlen:
+            self._popleft()
+        self.frames = deque(self.frames, maxlen=maxlen)
+
+    def drain(self) -> List[EncodedFrame]:
+        """Take every buffered frame, oldest first, and empty the buffer"""
+        frames = list(self.frames)
+        self.clear()
+        return frames
+
+    def clear(self):
+        with self._lock:
+            for entry in self.frames:
+                entry.buffered = False
+            self._bytes = 0
+        self.frames.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self.frames)
+
+
+def decode_frames(frames: List[EncodedFrame]) -> List[np.ndarray]:
+    """Decode compressed snippet frames back to BGR arrays, skipping any that failed to encode"""
+    decoded = (f.decode() for f in frames)
+    return [f for f in decoded if f is not None]
+
+
+def write_snippet(frames: List[EncodedFrame], snippet_path: str, fps: float) -> int:
+    """Decode compressed frames and write them to an mp4. Returns the number of frames written."""
+    decoded = decode_frames(frames)
+    if not decoded:
+        raise ValueError("No frames to write")
+    h, w = decoded[0].shape[:2]
+    fourcc = cv2.VideoWriter_fourcc(*'avc1')
+    writer = cv2.VideoWriter(snippet_path, fourcc, fps, (w, h))
+    if not writer.isOpened():
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        writer = cv2.VideoWriter(snippet_path, fourcc, fps, (w, h))
+    try:
+        for f in decoded:
+            if f.shape[:2] != (h, w):
+                # The camera's input resolution was changed while the footage was buffered
+                f = cv2.resize(f, (w, h), interpolation=cv2.INTER_AREA)
+            writer.write(f)
+    finally:
+        writer.release()
+    return len(decoded)
+
+
+class SnippetService:
+    def __init__(self):
+        # Shared JPEG encoder threads for every camera's snippet buffer
+        self.encoder_threads = max(1, settings.SNIPPET_ENCODER_THREADS)
+        self.encoder = ThreadPoolExecutor(max_workers=self.encoder_threads, thread_name_prefix="snippet-jpeg")
+        self.buffers: Dict[str, SnippetBuffer] = {}
+        self.snippets_dir = Path(__file__).resolve().parent.parent / "uploads" / "snippets"
+        self.snippets_dir.mkdir(parents=True, exist_ok=True)
+
+        # mp4 writer pool: bounded job queue drained by worker tasks, video encoding on dedicated threads
+        self.writer_count = max(1, settings.SNIPPET_ENCODER_WORKERS)
+        self.writer = ThreadPoolExecutor(max_workers=self.writer_count, thread_name_prefix="snippet-mp4")
+        self._jobs: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.jobs_dropped = 0
+        self.total_encode_ms = 0.0
+        self.last_encode_ms = 0.0
+
+    def create_buffer(self, camera_id: str, fps: float, seconds: Optional[float] = None) -> SnippetBuffer:
+        buffer = SnippetBuffer(
+            self.encoder,
+            fps=fps,
+            seconds=settings.SNIPPET_PRE_TRIGGER_SECONDS if seconds is None else seconds,
+            max_width=settings.SNIPPET_MAX_WIDTH,
+            quality=settings.SNIPPET_JPEG_QUALITY,
+            max_bytes=int(settings.SNIPPET_BUFFER_MAX_MB * 1024 * 1024),
+            max_pending=2 * self.encoder_threads + 4
+        )
+        self.buffers[camera_id] = buffer
+        return buffer
+
+    def release_buffer(self, camera_id: str):
+        self.buffers.pop(camera_id, None)
+
+    def get_memory_report(self, camera_id: str) -> dict:
+        buffer = self.buffers.get(camera_id)
+        if buffer is None:
+            return {"snippet_buffer_bytes": 0, "snippet_buffer_frames": 0}
+        return {
+            "snippet_buffer_bytes": buffer.nbytes,
+            "snippet_buffer_frames": len(buffer),
+            "snippet_buffer_max_bytes": buffer.max_bytes,
+            "snippet_repeated_frames": buffer.repeated_frames,
+        }
+
+    def _ensure_workers(self):
+        if self._jobs is None or not any(not w.done() for w in self._workers):
+            self._jobs = asyncio.Queue(maxsize=max(1, settings.SNIPPET_ENCODE_QUEUE_SIZE))
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.writer_count)]
+
+    def submit(self, frames: List[EncodedFrame], fps: float) -> Optional[asyncio.Future]:
+        """
+        Queue a snippet for mp4 encoding without blocking the event loop.
+        Returns a future resolving to the snippet URL, or None if the queue is full and the job was dropped.
+        """
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._jobs.put_nowait((frames, fps, future))
+        except asyncio.QueueFull:
+            self.jobs_dropped += 1
+            logger.warning(f"Snippet encode queue full ({self._jobs.maxsize}), dropping snippet")
+            return None
+        return future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frames, fps, future = await self._jobs.get()
+            snippet_filename = f"{uuid.uuid4()}.mp4"
+            snippet_path = str(self.snippets_dir / snippet_filename)
+            started = time.perf_counter()
+            try:
+                written = await loop.run_in_executor(self.writer, write_snippet, frames, snippet_path, fps)
+                self.last_encode_ms = (time.perf_counter() - started) * 1000
+                self.total_encode_ms += self.last_encode_ms
+                self.jobs_completed += 1
+                logger.info(f"Snippet saved: {snippet_path} ({written} frames at {fps:.0f}fps, {self.last_encode_ms:.0f}ms)")
+                if not future.done():
+                    future.set_result(f"/alerts/snippet/{snippet_filename}")
+            except Exception as e:
+                self.jobs_failed += 1
+                logger.error(f"Error saving snippet: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._jobs.task_done()
+
+    def get_stats(self) -> dict:
+        return {
+            "encoder_threads": self.encoder_threads,
+            # Buffered frames that repeat the previous one because the encoder threads fell behind
+            "repeated_frames": sum(buffer.repeated_frames for buffer in self.buffers.values()),
+            "workers": self.writer_count,
+            "queue_depth": self._jobs.qsize() if self._jobs is not None else 0,
+            "queue_capacity": settings.SNIPPET_ENCODE_QUEUE_SIZE,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "jobs_dropped": self.jobs_dropped,
+            "last_encode_ms": self.last_encode_ms,
+            "avg_encode_ms": self.total_encode_ms / self.jobs_completed if self.jobs_completed else 0.0,
+        }
+
+    async def shutdown(self):
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self.writer.shutdown(wait=False)
+        self.encoder.shutdown(wait=False)
+
+
+# Global instance
+snippet_service = SnippetService()
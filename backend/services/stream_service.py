@@ -1,20 +1,214 @@
 import cv2
+import asyncio
 import time
-import os
-class StreamService:
-    def generate_frames(self, video_path: str):
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Error opening video file: {video_path}")
+import logging
+from typing import Dict, NamedTuple, Optional, Set
+from .capture_service import capture_service, source_key
+
+logger = logging.getLogger(__name__)
+
+
+class Rendition(NamedTuple):
+    """Output parameters of an MJPEG feed; None means "as the source" / encoder default"""
+    width: Optional[int] = None
+    quality: Optional[int] = None
+    fps: Optional[float] = None
+
+
+# Server-side presets for /streams/feed/{stream_id}?preset=...
+STREAM_PRESETS: Dict[str, Rendition] = {
+    "thumbnail": Rendition(width=320, quality=60, fps=5.0),
+    "grid": Rendition(width=480, quality=70, fps=10.0),
+    "hd": Rendition(width=1280, quality=80, fps=15.0),
+    "full": Rendition(),
+}
+
+
+def resolve_rendition(preset: Optional[str] = None, width: Optional[int] = None,
+                      quality: Optional[int] = None, fps: Optional[float] = None) -> Rendition:
+    """Start from a preset (default: full) and let explicit parameters override it"""
+    if preset is not None and preset not in STREAM_PRESETS:
+        raise ValueError(f"Unknown preset '{preset}', expected one of {list(STREAM_PRESETS)}")
+    base = STREAM_PRESETS[preset or "full"]
+    width = width if width is not None else base.width
+    quality = quality if quality is not None else base.quality
+    fps = fps if fps is not None else base.fps
+    return Rendition(
+        width=min(max(width, 64), 3840) if width else None,
+        quality=min(max(quality, 10), 95) if quality else None,
+        fps=min(max(fps, 0.5), 60.0) if fps else None,
+    )
+
+
+class MjpegClient:
+    """
+    One connected viewer. Holds only the newest encoded part, so a slow
+    client skips frames instead of queueing them (per-client backpressure).
+    """
+
+    def __init__(self):
+        self._latest: Optional[bytes] = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+    def offer(self, part: bytes):
+        if self._latest is not None:
+            self.frames_skipped += 1
+        self._latest = part
+        self._event.set()
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+    async def next(self) -> Optional[bytes]:
+        """Wait for the next part to send; None once the broadcast has ended"""
+        while self._latest is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        part, self._latest = self._latest, None
+        self.frames_sent += 1
+        return part
+
+
+class MjpegBroadcaster:
+    """
+    Encodes each frame of a source to JPEG once, at one rendition, and pushes
+    the same bytes to every viewer of that rendition. Frames above the
+    rendition's fps are dropped before encoding. Started with its first
+    viewer, stopped with its last.
+    """
+
+    def __init__(self, source: str, key: str, rendition: Rendition):
+        self.source = source
+        self.key = key
+        self.rendition = rendition
+        self.clients: Set[MjpegClient] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.frames_encoded = 0
+        self.bytes_sent = 0
+        self.bytes_per_second = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    def add_client(self) -> MjpegClient:
+        client = MjpegClient()
+        self.clients.add(client)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return client
+
+    def remove_client(self, client: MjpegClient) -> int:
+        """Detach a viewer and return how many remain"""
+        self.clients.discard(client)
+        client.close()
+        if not self.clients and self._task is not None:
+            self._task.cancel()
+        return len(self.clients)
+
+    def record_sent(self, size: int):
+        self.bytes_sent += size
+        self._window_bytes += size
+        elapsed = time.monotonic() - self._window_start
+        if elapsed >= 1.0:
+            self.bytes_per_second = self._window_bytes / elapsed
+            self._window_start = time.monotonic()
+            self._window_bytes = 0
+
+    def _encode(self, frame) -> Optional[bytes]:
+        width = self.rendition.width
+        h, w = frame.shape[:2]
+        if width and w > width:
+            frame = cv2.resize(frame, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.rendition.quality] if self.rendition.quality else []
+        ret, buffer = cv2.imencode('.jpg', frame, params)
+        if not ret:
+            return None
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+    async def _run(self):
+        # Frames come from the shared per-source hub, so viewers never decode the video themselves
+        subscription = await capture_service.subscribe(self.source, lossless=False, queue_size=1)
+        if subscription is None:
+            logger.error(f"Error opening video file: {self.source}")
+            for client in list(self.clients):
+                client.close()
             return
-        while True:
-            success, frame = cap.read()
-            if not success:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                continue
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.033)
-stream_service = StreamService()
\ No newline at end of file
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rendition.fps if self.rendition.fps else 0.0
+        next_due = 0.0
+        try:
+            while self.clients:
+                captured = await subscription.get()
+                if captured is None:
+                    break
+                if interval:
+                    if captured.captured_at < next_due:
+                        continue
+                    # Keep the cadence, but re-anchor after a gap instead of bursting
+                    if captured.captured_at - next_due < interval:
+                        next_due += interval
+                    else:
+                        next_due = captured.captured_at + interval
+                part = await loop.run_in_executor(None, self._encode, captured.image)
+                if part is None:
+                    continue
+                self.frames_encoded += 1
+                for client in list(self.clients):
+                    client.offer(part)
+        finally:
+            subscription.close()
+            for client in list(self.clients):
+                client.close()
+
+    def get_stats(self) -> dict:
+        if time.monotonic() - self._window_start > 2.0:
+            # Nothing sent recently
+            self.bytes_per_second = 0.0
+        return {
+            "source": self.source,
+            "rendition": self.rendition._asdict(),
+            "viewers": len(self.clients),
+            "frames_encoded": self.frames_encoded,
+            "frames_skipped": sum(client.frames_skipped for client in self.clients),
+            "bytes_sent": self.bytes_sent,
+            "bytes_per_second": round(self.bytes_per_second, 1),
+        }
+
+
+class StreamService:
+    def __init__(self):
+        self.broadcasters: Dict[str, MjpegBroadcaster] = {}
+
+    async def generate_frames(self, video_path: str, rendition: Rendition = Rendition()):
+        # Viewers asking for the same rendition of the same source share one encoder
+        key = f"{source_key(video_path)}|{rendition.width}|{rendition.quality}|{rendition.fps}"
+        broadcaster = self.broadcasters.get(key)
+        if broadcaster is None:
+            broadcaster = MjpegBroadcaster(video_path, key, rendition)
+            self.broadcasters[key] = broadcaster
+        client = broadcaster.add_client()
+        try:
+            while True:
+                part = await client.next()
+                if part is None:
+                    break
+                broadcaster.record_sent(len(part))
+                yield part
+        finally:
+            if broadcaster.remove_client(client) == 0 and self.broadcasters.get(key) is broadcaster:
+                del self.broadcasters[key]
+
+    def get_stats(self) -> dict:
+        broadcasters = {key: b.get_stats() for key, b in self.broadcasters.items()}
+        return {
+            "viewers": sum(b["viewers"] for b in broadcasters.values()),
+            "bytes_per_second": sum(b["bytes_per_second"] for b in broadcasters.values()),
+            "broadcasters": broadcasters,
+        }
+stream_service = StreamService()
@@ -0,0 +1,248 @@
+import cv2
+import os
+import shutil
+import uuid
+import asyncio
+import logging
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from bson import ObjectId
+
+from ..config import settings
+from ..database import get_database
+from .ingest_service import probe_video
+
+logger = logging.getLogger(__name__)
+
+
+def mezzanine_path_for(video_path: str, content_hash: Optional[str]) -> Path:
+    """Mezzanine renditions sit next to the upload and are shared by identical uploads"""
+    source = Path(video_path)
+    stem = content_hash or source.stem
+    return source.parent / "mezzanine" / f"{stem}.mp4"
+
+
+def playback_source(stream: dict) -> Tuple[str, Optional[dict]]:
+    """
+    The file (and its probed metadata) that consumers should decode for a stream:
+    the normalized mezzanine rendition once it is ready, otherwise the original upload.
+    """
+    mezzanine = stream.get("mezzanine") or {}
+    if (settings.MEZZANINE_USE_FOR_PIPELINE and mezzanine.get("status") == "done"
+            and mezzanine.get("path") and os.path.exists(mezzanine["path"])):
+        return mezzanine["path"], mezzanine.get("metadata")
+    return stream["video_path"], stream.get("metadata")
+
+
+def _output_geometry(meta: dict, max_height: int, max_fps: float) -> Tuple[int, int, float]:
+    width, height = meta["width"], meta["height"]
+    if height > max_height:
+        width = int(width * max_height / height)
+        height = max_height
+    # H.264 wants even dimensions
+    width, height = width - width % 2, height - height % 2
+    fps = min(meta["fps"] or max_fps, max_fps)
+    return width, height, fps
+
+
+def _transcode_ffmpeg(ffmpeg: str, src: str, dst: str, width: int, height: int, fps: float,
+                      keyframe_interval: int, duration: float, progress, job_id: str):
+    cmd = [
+        ffmpeg, "-y", "-loglevel", "error", "-i", src, "-an",
+        "-vf", f"scale={width}:{height}", "-r", f"{fps:.3f}",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        # Short, fixed GOP: cheap seeks and restarts for every consumer
+        "-g", str(keyframe_interval), "-keyint_min", str(keyframe_interval), "-sc_threshold", "0",
+        "-movflags", "+faststart", "-progress", "pipe:1", "-nostats", dst,
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and duration and value.isdigit():
+            progress[job_id] = min(0.99, int(value) / 1e6 / duration)
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr.strip()[-500:]}")
+
+
+def _transcode_opencv(src: str, dst: str, width: int, height: int, fps: float,
+                      src_fps: float, frame_count: int, progress, job_id: str):
+    cap = cv2.VideoCapture(src)
+    writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*'avc1'), fps, (width, height))
+    if not writer.isOpened():
+        writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        index = 0
+        written = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # Decimate to the target fps by time, not by dropping every Nth frame
+            if index * fps / src_fps >= written:
+                if frame.shape[1] != width or frame.shape[0] != height:
+                    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                writer.write(frame)
+                written += 1
+            index += 1
+            if frame_count and index % 30 == 0:
+                progress[job_id] = min(0.99, index / frame_count)
+    finally:
+        cap.release()
+        writer.release()
+
+
+def transcode_mezzanine(src: str, dst: str, max_height: int, max_fps: float,
+                        keyframe_interval: int, progress, job_id: str) -> dict:
+    """
+    Produce the normalized rendition of src at dst (runs in a worker process).
+    Uses ffmpeg when available (fixed short GOP); otherwise falls back to
+    OpenCV, which can resize and cap fps but cannot control keyframes.
+    Returns the probed metadata of the result.
+    """
+    meta = probe_video(src)
+    if meta is None:
+        raise RuntimeError(f"Cannot open {src}")
+    width, height, fps = _output_geometry(meta, max_height, max_fps)
+
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    # Unique per job: another process may be producing the same rendition
+    partial = str(Path(dst).with_suffix(f".{uuid.uuid4().hex[:8]}.part.mp4"))
+    ffmpeg = shutil.which("ffmpeg")
+    try:
+        if ffmpeg:
+            _transcode_ffmpeg(ffmpeg, src, partial, width, height, fps, keyframe_interval,
+                              meta.get("duration_seconds") or 0.0, progress, job_id)
+        else:
+            _transcode_opencv(src, partial, width, height, fps, meta["fps"] or fps,
+                              meta["frame_count"], progress, job_id)
+        os.replace(partial, dst)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    progress[job_id] = 1.0
+    result = probe_video(dst)
+    if result is None:
+        raise RuntimeError(f"Transcoded file is unreadable: {dst}")
+    result["encoder"] = "ffmpeg" if ffmpeg else "opencv"
+    return result
+
+
+class TranscodeService:
+    """
+    Background mezzanine transcodes for uploads, in a process pool so
+    encoding never competes with the API process for the GIL. Progress is
+    mirrored onto the "mezzanine" field of every stream waiting for the
+    rendition: identical uploads arriving while it is being made join the
+    running job instead of starting another.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._pool_lock = threading.Lock()
+        self._jobs: Dict[str, asyncio.Task] = {}  # Mezzanine path -> transcode job
+        self._followers: Dict[str, Set[str]] = {}  # Mezzanine path -> ids of the streams waiting for it
+
+    def _ensure_pool(self):
+        """Start the pool and the progress Manager (blocking: spawns a process, run it off the event loop)"""
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawn, never fork: the API process already runs TF, executor threads and the event loop
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=max(1, settings.MEZZANINE_WORKERS), mp_context=context)
+                self._manager = context.Manager()
+                self._progress = self._manager.dict()
+
+    async def schedule(self, stream_id: str, video_path: str, content_hash: Optional[str]):
+        """Start (or reuse) the mezzanine rendition for a freshly uploaded stream"""
+        db = await get_database()
+        dst = mezzanine_path_for(video_path, content_hash)
+
+        # Identical upload already normalized: share its rendition
+        if content_hash:
+            existing = await db["streams"].find_one({
+                "content_hash": content_hash,
+                "mezzanine.status": "done",
+                "_id": {"$ne": ObjectId(stream_id)}
+            })
+            if existing and os.path.exists(existing["mezzanine"]["path"]):
+                await db["streams"].update_one(
+                    {"_id": ObjectId(stream_id)},
+                    {"$set": {"mezzanine": existing["mezzanine"]}}
+                )
+                return
+
+        await db["streams"].update_one(
+            {"_id": ObjectId(stream_id)},
+            {"$set": {"mezzanine": {"status": "pending", "progress": 0.0, "path": None, "metadata": None, "error": None}}}
+        )
+        # Identical upload being normalized right now: wait for that job
+        key = str(dst)
+        self._followers.setdefault(key, set()).add(stream_id)
+        if key not in self._jobs:
+            self._jobs[key] = asyncio.create_task(self._run(video_path, key))
+
+    def _follower_filter(self, dst: str) -> dict:
+        return {"_id": {"$in": [ObjectId(stream_id) for stream_id in self._followers.get(dst, ())]}}
+
+    async def _run(self, video_path: str, dst: str):
+        db = await get_database()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._ensure_pool)
+            # Manager proxy calls are blocking round-trips to the manager process
+            await loop.run_in_executor(None, self._progress.__setitem__, dst, 0.0)
+            await db["streams"].update_many(self._follower_filter(dst), {"$set": {"mezzanine.status": "running"}})
+            future = loop.run_in_executor(
+                self._pool, transcode_mezzanine, video_path, dst,
+                settings.MEZZANINE_MAX_HEIGHT, settings.MEZZANINE_MAX_FPS,
+                settings.MEZZANINE_KEYFRAME_INTERVAL, self._progress, dst
+            )
+            reported = 0.0
+            while not future.done():
+                await asyncio.wait({future}, timeout=1.0)
+                current = await loop.run_in_executor(None, self._progress.get, dst, 0.0)
+                if current - reported >= 0.01:
+                    reported = current
+                    await db["streams"].update_many(self._follower_filter(dst),
+                                                    {"$set": {"mezzanine.progress": round(current, 3)}})
+            metadata = future.result()
+            await db["streams"].update_many(self._follower_filter(dst), {"$set": {"mezzanine": {
+                "status": "done", "progress": 1.0, "path": dst, "metadata": metadata, "error": None
+            }}})
+            logger.info(f"Mezzanine ready for streams {sorted(self._followers.get(dst, ()))}: {dst} ({metadata.get('width')}x{metadata.get('height')} @ {metadata.get('fps'):.1f}fps)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Mezzanine transcode failed for {dst}: {e}")
+            await db["streams"].update_many(self._follower_filter(dst),
+                                            {"$set": {"mezzanine.status": "failed", "mezzanine.error": str(e)}})
+        finally:
+            self._jobs.pop(dst, None)
+            self._followers.pop(dst, None)
+            if self._progress is not None:
+                try:
+                    await loop.run_in_executor(None, self._progress.pop, dst, None)
+                except Exception:
+                    pass  # Manager already shut down
+
+    async def shutdown(self):
+        for task in list(self._jobs.values()):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+# Global instance
+transcode_service = TranscodeService()
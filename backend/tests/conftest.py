@@ -0,0 +1,34 @@
+"""
+Unit tests for the backend services (no MongoDB, camera or model needed).
+
+    pip install pytest httpx
+    python -m pytest backend/tests -q
+
+Modules whose dependencies are not installed are skipped.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the repository root to the path so "backend" imports as a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+# Settings without defaults, for checkouts without a backend/.env (environment
+# variables would override the file's values)
+TEST_SETTINGS = {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DB_NAME": "test",
+    "SECRET_KEY": "test-secret",
+    "ADMIN_EMAIL": "admin@example.com",
+    "ADMIN_PASSWORD": "admin",
+    "MAIL_USERNAME": "test",
+    "MAIL_PASSWORD": "test",
+    "MAIL_FROM": "noreply@example.com",
+    "MAIL_PORT": "587",
+    "MAIL_SERVER": "localhost",
+    "MAIL_FROM_NAME": "Test",
+}
+if not (Path(__file__).resolve().parent.parent / ".env").exists():
+    for name, value in TEST_SETTINGS.items():
+        os.environ.setdefault(name, value)
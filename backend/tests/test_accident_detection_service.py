@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("tensorflow")
+
+from backend.services.accident_detection_service import FeatureRing, FrameRing, PredictionCache
+
+
+def frame(value: int) -> "np.ndarray":
+    return np.full((2, 2, 3), value, dtype=np.uint8)
+
+
+def test_frame_ring_orders_oldest_first_after_wrapping():
+    ring = FrameRing(sequence_length=4, height=2, width=2)
+    for value in range(1, 7):
+        ring.push(frame(value))
+    assert len(ring) == 4
+    assert ring.ordered()[:, 0, 0, 0].tolist() == [3, 4, 5, 6]
+
+
+def test_frame_ring_reuses_its_snapshot():
+    ring = FrameRing(sequence_length=2, height=2, width=2)
+    ring.push(frame(1))
+    ring.push(frame(2))
+    assert ring.ordered() is ring.snapshot
+    out = np.empty_like(ring.frames)
+    assert ring.ordered(out) is out
+
+
+def test_feature_ring_clear_starts_a_new_window():
+    ring = FeatureRing(sequence_length=3, feature_dim=1)
+    for value in range(4):
+        ring.push(np.array([value], dtype=np.float32))
+    assert ring.is_full()
+    assert ring.ordered()[:, 0].tolist() == [1.0, 2.0, 3.0]
+    ring.clear()
+    assert not ring.is_full()
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2)
+    cache.put(("a",), (False, 0.1))
+    cache.put(("b",), (True, 0.9))
+    assert cache.get(("a",)) == (False, 0.1)  # "a" is now the most recent
+    cache.put(("c",), (False, 0.2))
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == (False, 0.1)
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+
+def test_prediction_cache_keys_are_exact():
+    cache = PredictionCache(max_entries=8)
+    cache.put(("video", 0, 16, "v1", None), (True, 0.8))
+    assert cache.get(("video", 0, 16, "v2", None)) is None
+    assert cache.get(("video", 0, 16, "v1", "screener")) is None
+    assert cache.get(("video", 0, 16, "v1", None)) == (True, 0.8)
+
+
+def test_disabled_prediction_cache_stores_nothing():
+    cache = PredictionCache(max_entries=0)
+    cache.put(("a",), (True, 1.0))
+    assert cache.get(("a",)) is None
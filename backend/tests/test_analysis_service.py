@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("tensorflow")
+pytest.importorskip("motor")
+
+from backend.services.analysis_service import ScoreTimeline
+
+
+def timeline(scores, stride=16, first_frame=15):
+    return ScoreTimeline({"stride": stride, "sequence_length": 16, "first_frame": first_frame, "scores": scores})
+
+
+def test_no_window_before_the_first_one_ends():
+    assert timeline([0.1, 0.2]).window_at(14) is None
+
+
+def test_latest_window_ending_at_or_before_the_frame():
+    scores = timeline([0.1, 0.2, 0.3])
+    assert scores.window_at(15) == 0
+    assert scores.window_at(30) == 0
+    assert scores.window_at(31) == 1
+    assert scores.window_at(47) == 2
+
+
+def test_frames_past_the_end_use_the_last_window():
+    assert timeline([0.1, 0.2]).window_at(10_000) == 1
+
+
+def test_empty_timeline_has_no_windows():
+    assert timeline([]).window_at(100) is None
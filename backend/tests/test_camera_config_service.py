@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from backend.config import settings
+from backend.models import CameraPipelineConfig
+from backend.services.camera_config_service import camera_config_service
+
+
+def resolve(source_fps: float = 30.0, embedding_mode: bool = False, **config):
+    return camera_config_service.resolve(CameraPipelineConfig(**config), source_fps, embedding_mode)
+
+
+def test_defaults_follow_the_global_settings():
+    tuning = resolve()
+    assert tuning.frame_step == 1.0
+    assert tuning.fps == 30.0
+    assert tuning.predict_every == 16
+    assert tuning.pre_trigger_seconds == settings.SNIPPET_PRE_TRIGGER_SECONDS
+    assert tuning.post_capture_frames == 90
+
+
+def test_embedding_mode_default_cadence():
+    assert resolve(embedding_mode=True).predict_every == max(1, settings.EMBEDDING_PREDICT_EVERY)
+
+
+def test_camera_values_override_the_globals():
+    tuning = resolve(embedding_mode=True, predict_every=4, pre_trigger_seconds=0.0)
+    assert tuning.predict_every == 4
+    # An explicit 0 is a value, not "unset"
+    assert tuning.pre_trigger_seconds == 0.0
+
+
+def test_target_fps_decimates_the_source():
+    tuning = resolve(source_fps=30.0, target_fps=10.0, post_trigger_seconds=2.0)
+    assert tuning.frame_step == 3.0
+    assert tuning.fps == 10.0
+    assert tuning.post_capture_frames == 20
+
+
+def test_target_fps_never_upsamples():
+    tuning = resolve(source_fps=15.0, target_fps=30.0)
+    assert tuning.frame_step == 1.0
+    assert tuning.fps == 15.0
+
+
+def test_unknown_source_fps_assumes_30():
+    assert resolve(source_fps=0.0).fps == 30.0
+
+
+def test_stored_config_ignores_dropped_fields_and_falls_back_when_invalid():
+    config = camera_config_service.get_config({"pipeline": {"detection_threshold": 5, "input_width": 640}})
+    assert config.detection_threshold == 5
+    invalid = camera_config_service.get_config({"_id": "cam", "pipeline": {"detection_threshold": 0}})
+    assert invalid == CameraPipelineConfig()
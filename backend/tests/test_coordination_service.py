@@ -0,0 +1,119 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("motor")
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.models import get_pkt_now
+from backend.services import coordination_service
+from backend.services.coordination_service import DetectorCoordinator
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(_matches(doc, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict):
+            value = doc.get(key)
+            for op, operand in expected.items():
+                if op == "$lte" and not value <= operand:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+        elif doc.get(key) != expected:
+            return False
+    return True
+
+
+class FakeLeases:
+    """The few detector_leases operations claim/release/route use, with Mongo's upsert semantics"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            if upsert:
+                self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+        elif _matches(doc, query):
+            doc.update(update["$set"])
+        elif upsert:
+            # The upsert tries to insert a second document with the same _id
+            raise DuplicateKeyError("E11000 duplicate key error")
+
+    async def delete_one(self, query: dict):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and _matches(doc, query):
+            del self.docs[query["_id"]]
+
+    async def find_one(self, query: dict):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None and _matches(doc, query) else None
+
+
+@pytest.fixture
+def leases(monkeypatch):
+    collection = FakeLeases()
+
+    async def get_database():
+        return {"detector_leases": collection}
+
+    monkeypatch.setattr(coordination_service, "get_database", get_database)
+    return collection
+
+
+def node(node_id: str, port: int) -> DetectorCoordinator:
+    coordinator = DetectorCoordinator()
+    coordinator.node_id = node_id
+    coordinator.address = ("10.0.0.1", port)
+    return coordinator
+
+
+def test_claim_is_exclusive_while_the_lease_is_live(leases):
+    a, b = node("a", 6001), node("b", 6002)
+    assert asyncio.run(a.claim("cam")) is True
+    assert asyncio.run(b.claim("cam")) is False
+    assert leases.docs["cam"]["node_id"] == "a"
+    assert a.owned == {"cam"} and b.owned == set()
+
+
+def test_renewing_extends_the_lease_without_a_new_claim(leases):
+    a = node("a", 6001)
+    asyncio.run(a.claim("cam"))
+    leases.docs["cam"]["expires_at"] = get_pkt_now() + timedelta(seconds=1)
+    assert asyncio.run(a.claim("cam")) is True
+    assert leases.docs["cam"]["expires_at"] > get_pkt_now() + timedelta(seconds=5)
+    assert a.claims == 1
+
+
+def test_expired_lease_can_be_taken_over(leases):
+    a, b = node("a", 6001), node("b", 6002)
+    asyncio.run(a.claim("cam"))
+    leases.docs["cam"]["expires_at"] = get_pkt_now() - timedelta(seconds=1)
+    assert asyncio.run(b.claim("cam")) is True
+    assert leases.docs["cam"]["node_id"] == "b"
+    assert leases.docs["cam"]["address"] == ["10.0.0.1", 6002]
+
+
+def test_release_only_frees_our_own_lease(leases):
+    a, b = node("a", 6001), node("b", 6002)
+    asyncio.run(a.claim("cam"))
+    asyncio.run(b.release("cam"))
+    assert "cam" in leases.docs
+    asyncio.run(a.release("cam"))
+    assert "cam" not in leases.docs
+    assert a.owned == set() and a.releases == 1
+
+
+def test_route_points_at_the_live_owner(leases):
+    a, b = node("a", 6001), node("b", 6002)
+    asyncio.run(a.claim("cam"))
+    assert asyncio.run(a.route("cam")) is None  # Our own camera
+    assert asyncio.run(b.route("cam")) == ("10.0.0.1", 6001)
+    leases.docs["cam"]["expires_at"] = get_pkt_now() - timedelta(seconds=1)
+    assert asyncio.run(b.route("cam")) is None  # Nobody holds a live lease
@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.services.file_service import serve_file
+
+CONTENT = bytes(range(256)) * 4  # 1 KiB
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return serve_file(request, path)
+
+    return TestClient(app)
+
+
+def test_full_response_has_validators(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"].startswith('"')
+    assert "last-modified" in response.headers
+    assert response.headers["cache-control"] == "private, max-age=3600"
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_if_none_match_mismatch_returns_body(client):
+    response = client.get("/file", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_range_returns_partial_content(client):
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["content-length"] == "10"
+
+
+def test_open_ended_and_suffix_ranges(client):
+    assert client.get("/file", headers={"Range": "bytes=1000-"}).content == CONTENT[1000:]
+    assert client.get("/file", headers={"Range": "bytes=-24"}).content == CONTENT[-24:]
+
+
+def test_unsatisfiable_range_returns_416(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_with_current_etag_honours_range(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_if_range_with_stale_etag_returns_full_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_range_with_weak_etag_returns_full_file(client):
+    # RFC 7233: If-Range uses the strong comparison, a weak validator never matches
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": f"W/{etag}"})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_range_with_last_modified_honours_range(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": last_modified})
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend.config import settings
+from backend.services import ingest_service as ingest_module
+from backend.services.ingest_service import IngestService, UploadTooLarge
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_MB", 1)
+    monkeypatch.setattr(ingest_module, "FORM_OVERHEAD_BYTES", 1024)
+    monkeypatch.setattr(ingest_module, "probe_video", lambda path: None)
+    service = IngestService(tmp_path)
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            file = await service.read_upload(request)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        if file is None:
+            raise HTTPException(status_code=422, detail="Missing upload field 'file'")
+        try:
+            ingested = await service.ingest(file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            await file.close()
+        return {"content_hash": ingested["content_hash"], "size_bytes": ingested["size_bytes"],
+                "deduplicated": ingested["deduplicated"]}
+
+    return TestClient(app)
+
+
+def test_upload_is_stored_by_content_hash(client, tmp_path):
+    first = client.post("/upload", files={"file": ("a.mp4", b"video bytes")}).json()
+    second = client.post("/upload", files={"file": ("b.mp4", b"video bytes")}).json()
+    assert first["size_bytes"] == 11
+    assert (tmp_path / f"{first['content_hash']}.mp4").read_bytes() == b"video bytes"
+    assert second == {**first, "deduplicated": True}
+
+
+def test_missing_file_field(client):
+    assert client.post("/upload", files={"other": ("a.mp4", b"x")}).status_code == 422
+
+
+def test_oversized_content_length_is_refused_up_front(client):
+    response = client.post("/upload", files={"file": ("a.mp4", b"x" * (2 * 1024 * 1024))})
+    assert response.status_code == 413
+
+
+def test_oversized_stream_without_length_is_cut_off(client):
+    def body():
+        yield b"--boundary\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.mp4\"\r\n\r\n"
+        for _ in range(3):
+            yield b"x" * (1024 * 1024)
+
+    response = client.post("/upload", content=body(),
+                           headers={"Content-Type": "multipart/form-data; boundary=boundary"})
+    assert response.status_code == 413
+
+
+def test_file_over_the_limit_is_refused(client, tmp_path):
+    # Fits in the form allowance, but the file itself is over MAX_UPLOAD_MB
+    response = client.post("/upload", files={"file": ("a.mp4", b"x" * (1024 * 1024 + 10))})
+    assert response.status_code == 413
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from backend.services.motion_service import MotionGate
+
+STILL = np.zeros((120, 160, 3), dtype=np.uint8)
+MOVED = np.full((120, 160, 3), 255, dtype=np.uint8)
+
+
+def gate(max_skip_frames: int = 100) -> MotionGate:
+    return MotionGate(threshold=0.01, max_skip_frames=max_skip_frames)
+
+
+def test_first_frame_counts_as_motion():
+    motion = gate()
+    assert motion.update(STILL) == 1.0
+    assert motion.allow_prediction() is True
+
+
+def test_static_scene_skips_predictions_until_motion():
+    motion = gate()
+    motion.update(STILL)
+    motion.allow_prediction()
+    motion.update(STILL)
+    assert motion.allow_prediction() is False
+    motion.update(MOVED)
+    motion.update(MOVED)  # Motion since the last prediction still counts
+    assert motion.allow_prediction() is True
+    assert (motion.predictions_allowed, motion.predictions_skipped) == (2, 1)
+
+
+def test_max_skip_frames_forces_a_prediction():
+    motion = gate(max_skip_frames=3)
+    motion.update(STILL)
+    motion.allow_prediction()
+    for _ in range(3):
+        motion.update(STILL)
+    assert motion.allow_prediction() is True
+
+
+def test_embeddings_are_skipped_only_after_a_static_stretch():
+    motion = gate()
+    motion.update(STILL)
+    motion.allow_prediction()
+    motion.update(STILL)
+    assert motion.skip_embedding(idle_frames=2) is False
+    motion.update(STILL)
+    assert motion.skip_embedding(idle_frames=2) is True
+    motion.update(MOVED)
+    assert motion.skip_embedding(idle_frames=2) is False
+    assert motion.get_stats()["embeddings_skipped"] == 1
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("numpy")
+
+from backend.services.stream_service import Rendition, STREAM_PRESETS, resolve_rendition
+
+
+def test_default_is_the_full_source():
+    assert resolve_rendition() == Rendition()
+
+
+def test_preset_values():
+    assert resolve_rendition("grid") == STREAM_PRESETS["grid"]
+
+
+def test_explicit_parameters_override_the_preset():
+    rendition = resolve_rendition("grid", width=640, fps=2.0)
+    assert rendition == Rendition(width=640, quality=STREAM_PRESETS["grid"].quality, fps=2.0)
+
+
+def test_values_are_clamped():
+    assert resolve_rendition(width=10, quality=100, fps=120.0) == Rendition(width=64, quality=95, fps=60.0)
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_rendition("huge")
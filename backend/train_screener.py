@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Distill the cascade's screening model from the CNN-LSTM.
+
+The full model labels 16-frame windows cut from a folder of videos with its
+softmax outputs; the small screening model is trained to reproduce them and
+saved to aiModel/accident_screener.keras, where the backend picks it up.
+
+    python backend/train_screener.py Videos --epochs 10
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.config import settings
+from backend.services.accident_detection_service import accident_detection_service
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+def iter_windows(video_path: Path, sequence_length: int, stride: int):
+    """Yield uint8 (sequence_length, 224, 224, 3) windows of one video"""
+    cap = cv2.VideoCapture(str(video_path))
+    frames = []
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(accident_detection_service.preprocess_frame(frame))
+            if len(frames) == sequence_length:
+                yield np.stack(frames)
+                frames = frames[stride:]
+    finally:
+        cap.release()
+
+
+def build_dataset(video_dir: Path, stride: int, max_windows: int):
+    """Downscaled uint8 windows plus the full model's soft labels for each (cast to float in the trainer)"""
+    size = settings.CASCADE_SCREEN_SIZE
+    sequence_length = accident_detection_service.sequence_length
+    videos = sorted(p for p in video_dir.rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+    print(f"📂 {len(videos)} videos in {video_dir}")
+
+    inputs, targets, batch = [], [], []
+
+    def flush():
+        teacher = accident_detection_service.backend.predict_sequences(np.stack(batch))
+        targets.extend(teacher)
+        batch.clear()
+
+    for video in videos:
+        for window in iter_windows(video, sequence_length, stride):
+            batch.append(window)
+            inputs.append(np.stack([cv2.resize(f, (size, size), interpolation=cv2.INTER_AREA) for f in window]))
+            if len(batch) == settings.INFERENCE_MAX_BATCH_SIZE:
+                flush()
+            if len(inputs) >= max_windows:
+                break
+        if len(inputs) >= max_windows:
+            break
+    if batch:
+        flush()
+
+    print(f"🎞️  {len(inputs)} windows labelled by the teacher")
+    return np.stack(inputs), np.stack(targets).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video_dir", type=Path, help="Folder of training videos (searched recursively)")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--stride", type=int, default=8, help="Frames between consecutive windows")
+    parser.add_argument("--max-windows", type=int, default=2000)
+    parser.add_argument("--output", type=Path, default=accident_detection_service.screener_path)
+    args = parser.parse_args()
+
+    accident_detection_service.load_model(use_cache=False)
+    x, y = build_dataset(args.video_dir, args.stride, args.max_windows)
+    if len(x) == 0:
+        print("❌ No windows found")
+        sys.exit(1)
+
+    screener = accident_detection_service.build_screening_model()
+    # The windows stay uint8 (a float32 copy would be 4x the memory); each batch is cast in the graph,
+    # the same 0-255 float input the screener gets at inference
+    frames = tf.keras.Input(shape=x.shape[1:], dtype="uint8")
+    trainer = tf.keras.Model(frames, screener(tf.keras.layers.Lambda(lambda t: tf.cast(t, tf.float32))(frames)))
+    # Soft teacher targets: categorical cross-entropy against the full model's distribution
+    trainer.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
+    trainer.fit(x, y, epochs=args.epochs, batch_size=args.batch_size, validation_split=0.1, shuffle=True)
+
+    # How often the screener would let a teacher-positive window through at the escalation threshold
+    student = trainer.predict(x, batch_size=args.batch_size)[:, 1]
+    positives = y[:, 1] > accident_detection_service.confidence_threshold
+    if positives.any():
+        recall = float(np.mean(student[positives] >= settings.CASCADE_ESCALATE_THRESHOLD))
+        print(f"🎯 Escalation recall on teacher positives: {recall:.3f}")
+    print(f"📈 Escalation rate: {float(np.mean(student >= settings.CASCADE_ESCALATE_THRESHOLD)):.3f}")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    screener.save(str(args.output))
+    print(f"💾 Screening model saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
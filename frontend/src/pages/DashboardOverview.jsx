@@ -3,6 +3,7 @@ import axios from 'axios';
 import { AlertTriangle, Video, MapPin, Trash2, Camera, FileText, X, Mail, Globe, Activity, Bell, CheckCircle, XCircle, Clock, Zap } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { useAuth } from '../context/AuthContext';
+import { withFeedPreset } from '../utils/feeds';
 
 const AUTO_DISPATCH_SECONDS = 15;
 const OVERLAY_DISPLAY_SECONDS = 15;
@@ -242,7 +243,7 @@ const CameraCard = ({ camera }) => {
                 <div className="absolute inset-0">
 
                     <img
-                        src={camera.url}
+                        src={withFeedPreset(camera.url, 'grid')}
                         alt={camera.name}
                         className={`w-full h-full object-cover transition-opacity duration-500 ${isLive ? 'opacity-80 group-hover:opacity-100' : 'opacity-0'}`}
                         onLoad={() => { setIsLive(true); setHasError(false); }}
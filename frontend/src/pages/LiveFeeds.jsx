@@ -3,6 +3,7 @@ import axios from 'axios';
 import { MapPin, AlertTriangle, Trash2, Video, Eye, EyeOff } from 'lucide-react';
 
 import { useAuth } from '../context/AuthContext';
+import { withFeedPreset } from '../utils/feeds';
 
 const CameraFeedCard = ({ cam, user, handleGenerateAlert, handleDeleteCamera, handleToggleDetection, detectionStatus }) => {
     const [isLive, setIsLive] = useState(false);
@@ -15,7 +16,7 @@ const CameraFeedCard = ({ cam, user, handleGenerateAlert, handleDeleteCamera, ha
                 {/* Video Feed */}
                 {cam.url && !hasError ? (
                     <img
-                        src={cam.url}
+                        src={withFeedPreset(cam.url, 'grid')}
                         alt={cam.name}
                         className={`w-full h-full object-cover transition-opacity duration-500 ${isLive ? 'opacity-100' : 'opacity-0'}`}
                         onLoad={() => { setIsLive(true); setHasError(false); }}
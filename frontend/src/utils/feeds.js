@@ -0,0 +1,4 @@
+// Ask the backend for a downscaled, lower-fps rendition of our own MJPEG feeds
+export const withFeedPreset = (url, preset) => (
+    url.includes('/streams/feed/') ? `${url}${url.includes('?') ? '&' : '?'}preset=${preset}` : url
+);